@@ -1,6 +1,10 @@
 import asyncio
+import socket
 
 import BAC0
+from bacpypes3.pdu import Address
+
+from bacnet_rpm import LAB_TAGS, TagBatch
 
 
 async def main() -> None:
@@ -8,12 +12,12 @@ async def main() -> None:
     bacnet = BAC0.lite(ip="0.0.0.0/24", port=47809, ping=False)
     target = "proto-server-bacnet"
 
+    # Setpoints go out in one WritePropertyMultiple, reads in one ReadPropertyMultiple.
+    batch = TagBatch(bacnet.this_application.app, Address(socket.gethostbyname(target)), LAB_TAGS)
     for step in range(3):
-        bacnet.write(f"{target} binaryOutput 1 presentValue {step % 2}")
-        bacnet.write(f"{target} analogOutput 1 presentValue {75 + step}")
+        await batch.write({"DO_01": "active" if step % 2 else "inactive", "AO_01": 75.0 + step})
         await asyncio.sleep(1)
-        ai1 = bacnet.read(f"{target} analogInput 1 presentValue")
-        print("AI_01", ai1)
+        print("AI_01", (await batch.read(["AI_01"]))["AI_01"])
 
 
 if __name__ == "__main__":
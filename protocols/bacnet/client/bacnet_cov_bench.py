@@ -0,0 +1,167 @@
+import asyncio
+import contextlib
+import os
+import socket
+import time
+from typing import Dict, List, Optional, Tuple
+
+from bacpypes3.app import Application
+from bacpypes3.argparse import SimpleArgumentParser
+from bacpypes3.basetypes import PropertyIdentifier
+from bacpypes3.pdu import Address
+from bacpypes3.primitivedata import ObjectIdentifier
+
+TARGET = os.environ.get("BACNET_TARGET", "proto-server-bacnet")
+# Local bind; port 47809 to avoid conflict with the server.
+ADDRESS = os.environ.get("BACNET_BENCH_ADDRESS", "0.0.0.0/24:47809")
+SECONDS = float(os.environ.get("BACNET_BENCH_SECONDS", "10"))
+POLL_INTERVALS = [float(s) for s in os.environ.get("BACNET_BENCH_POLL_INTERVALS", "1,0.2").split(",")]
+# AO_04 writes/s in every case; the server mirrors each to AI_04, which times write -> seen.
+WRITE_RATE = float(os.environ.get("BACNET_BENCH_WRITE_RATE", "5"))
+CONFIRMED = os.environ.get("BACNET_BENCH_CONFIRMED", "0") == "1"
+
+OBJECTS = (
+    [(f"DO_0{i}", f"binaryOutput,{i}") for i in range(1, 9)]
+    + [(f"DI_0{i}", f"binaryInput,{i}") for i in range(1, 9)]
+    + [(f"AO_0{i}", f"analogOutput,{i}") for i in range(1, 5)]
+    + [(f"AI_0{i}", f"analogInput,{i}") for i in range(1, 5)]
+    + [("TMR_01", "analogValue,1"), ("CNT_01", "analogValue,2")]
+)
+
+
+class Traffic:
+    """Counts the datagrams and bytes the application's UDP endpoint sends and receives."""
+
+    def __init__(self, app: Application) -> None:
+        self.sent = self.received = self.sent_bytes = self.received_bytes = 0
+        for link_layer in app.link_layers.values():
+            server = link_layer.server
+            indication, confirmation = server.indication, server.confirmation
+
+            async def counted_indication(pdu, indication=indication):
+                self.sent += 1
+                self.sent_bytes += len(pdu.pduData)
+                await indication(pdu)
+
+            async def counted_confirmation(pdu, confirmation=confirmation):
+                self.received += 1
+                self.received_bytes += len(pdu.pduData)
+                await confirmation(pdu)
+
+            server.indication, server.confirmation = counted_indication, counted_confirmation
+
+    def snapshot(self) -> Tuple[int, int, int, int]:
+        return self.sent, self.received, self.sent_bytes, self.received_bytes
+
+
+class Echoes:
+    """AO_04 values written, matched against the AI_04 values the client sees."""
+
+    def __init__(self) -> None:
+        self.pending: Dict[float, float] = {}
+        self.latencies: List[float] = []
+
+    def seen(self, value: float) -> None:
+        sent = self.pending.pop(float(value), None)
+        if sent is not None:
+            self.latencies.append(time.monotonic() - sent)
+
+
+async def write_loop(app: Application, target: Address, echoes: Echoes, end: float) -> int:
+    if WRITE_RATE <= 0:
+        await asyncio.sleep(max(end - time.monotonic(), 0))
+        return 0
+    ao4 = ObjectIdentifier("analogOutput,4")
+    writes = 0
+    deadline = time.monotonic()
+    while deadline < end:
+        writes += 1
+        value = float(writes % 100 + 1)
+        echoes.pending[value] = time.monotonic()
+        await app.write_property(target, ao4, "presentValue", value)
+        deadline += 1.0 / WRITE_RATE
+        await asyncio.sleep(max(deadline - time.monotonic(), 0))
+    return writes
+
+
+async def poll_case(app: Application, target: Address, interval: float, echoes: Echoes, end: float) -> None:
+    """ReadProperty presentValue of every object, one request each, every interval."""
+    oids = [(name, ObjectIdentifier(oid)) for name, oid in OBJECTS]
+    deadline = time.monotonic()
+    while deadline < end:
+        for name, oid in oids:
+            value = await app.read_property(target, oid, "presentValue")
+            if name == "AI_04":
+                echoes.seen(value)
+        deadline += interval
+        await asyncio.sleep(max(deadline - time.monotonic(), 0))
+
+
+async def cov_case(app: Application, target: Address, echoes: Echoes, end: float) -> None:
+    """SubscribeCOV on every object; values arrive as notifications."""
+
+    async def consume(name, scm) -> None:
+        while True:
+            prop, value = await scm.get_value()
+            if name == "AI_04" and prop == PropertyIdentifier.presentValue:
+                echoes.seen(value)
+
+    async with contextlib.AsyncExitStack() as stack:
+        tasks = []
+        for proc_id, (name, oid) in enumerate(OBJECTS, start=1):
+            scm = await stack.enter_async_context(
+                app.change_of_value(target, ObjectIdentifier(oid), proc_id, CONFIRMED, 300)
+            )
+            tasks.append(asyncio.ensure_future(consume(name, scm)))
+        await asyncio.sleep(max(end - time.monotonic(), 0))
+        for task in tasks:
+            task.cancel()
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+async def run_case(app: Application, target: Address, traffic: Traffic, interval: Optional[float]) -> str:
+    echoes = Echoes()
+    before = traffic.snapshot()
+    start = time.monotonic()
+    end = start + SECONDS
+    if interval is None:
+        watch = cov_case(app, target, echoes, end)
+    else:
+        watch = poll_case(app, target, interval, echoes, end)
+    writes, _ = await asyncio.gather(write_loop(app, target, echoes, end), watch)
+    await asyncio.sleep(0.5)  # late notifications and the unsubscribe acks
+    elapsed = time.monotonic() - start
+    sent, received, sent_bytes, received_bytes = (b - a for a, b in zip(before, traffic.snapshot()))
+    latencies = sorted(echoes.latencies)
+    if latencies:
+        dist = f"{percentile(latencies, 0.5) * 1000:>7.1f} {percentile(latencies, 0.99) * 1000:>7.1f}"
+    else:
+        dist = f"{'-':>7} {'-':>7}"
+    label = "COV" if interval is None else f"poll {interval:g}s"
+    return (
+        f"{label:<10} {(sent + received) / elapsed:>9.1f} {(sent_bytes + received_bytes) / elapsed:>8.0f} "
+        f"{sent / elapsed:>7.1f} {received / elapsed:>7.1f} {len(latencies):>4}/{writes:<4} {dist}"
+    )
+
+
+async def main() -> None:
+    args = SimpleArgumentParser().parse_args(["--address", ADDRESS, "--instance", "999"])
+    app = Application.from_args(args)
+    traffic = Traffic(app)
+    target = Address(socket.gethostbyname(TARGET))
+
+    print(
+        f"BACnet polling vs COV ({TARGET}, {len(OBJECTS)} objects, {WRITE_RATE:g} AO_04 writes/s, "
+        f"{SECONDS:.0f}s per case, {'confirmed' if CONFIRMED else 'unconfirmed'} notifications)"
+    )
+    print(f"{'case':<10} {'pkts/s':>9} {'bytes/s':>8} {'out/s':>7} {'in/s':>7} {'seen':>9} {'p50 ms':>7} {'p99 ms':>7}")
+    for interval in [*POLL_INTERVALS, None]:
+        print(await run_case(app, target, traffic, interval))
+    app.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
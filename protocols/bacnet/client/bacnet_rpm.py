@@ -0,0 +1,148 @@
+"""ReadPropertyMultiple for a whole tag list and WritePropertyMultiple for a batch of
+setpoints (bacpypes3; BAC0's `this_application.app` works too), instead of one
+ReadProperty/WriteProperty round trip per property."""
+from typing import Dict, List, Optional, Tuple
+
+from bacpypes3.apdu import AbortPDU, AbortReason, WritePropertyMultipleRequest
+from bacpypes3.app import Application
+from bacpypes3.basetypes import PropertyIdentifier, PropertyValue, Segmentation, WriteAccessSpecification
+from bacpypes3.constructeddata import Any
+from bacpypes3.pdu import Address
+from bacpypes3.primitivedata import ObjectIdentifier
+
+# Bench tag list, name -> (object, property), in object order.
+LAB_TAGS = {
+    name: (oid, "presentValue")
+    for name, oid in (
+        [(f"DO_0{i}", f"binaryOutput,{i}") for i in range(1, 9)]
+        + [(f"DI_0{i}", f"binaryInput,{i}") for i in range(1, 9)]
+        + [(f"AO_0{i}", f"analogOutput,{i}") for i in range(1, 5)]
+        + [(f"AI_0{i}", f"analogInput,{i}") for i in range(1, 5)]
+        + [("TMR_01", "analogValue,1"), ("CNT_01", "analogValue,2")]
+    )
+}
+
+# Planning estimates for an encoded ReadAccessResult: the object identifier and list
+# brackets, then per property its identifier, result brackets and a primitive or short
+# string value. A chunk the estimate gets wrong is split again on the peer's abort.
+APDU_HEADER_BYTES = 8
+OBJECT_BYTES = 7
+PROPERTY_BYTES = 16
+SEGMENTED_TRANSMIT = (Segmentation.segmentedBoth, Segmentation.segmentedTransmit)
+SPLIT_ON_ABORT = (AbortReason.segmentationNotSupported, AbortReason.bufferOverflow, AbortReason.apduTooLong)
+
+Spec = List[Tuple[ObjectIdentifier, List[PropertyIdentifier]]]
+
+
+class TagBatch:
+    def __init__(
+        self,
+        app: Application,
+        address: Address,
+        tags: Dict[str, Tuple[str, str]],
+        segmented: Optional[bool] = None,
+        max_apdu: Optional[int] = None,
+    ) -> None:
+        """segmented/max_apdu default to what the peer's I-Am announces: with segmented
+        responses the whole list is one RPM, without it the list is split so each reply
+        fits in max_apdu."""
+        self.app = app
+        self.address = address
+        self.tags = {
+            name: (ObjectIdentifier(oid), PropertyIdentifier(prop)) for name, (oid, prop) in tags.items()
+        }
+        self.segmented = segmented
+        self.max_apdu = max_apdu
+        self.chunks: Optional[List[Spec]] = None
+
+    async def plan(self) -> List[Spec]:
+        """Read access specs per RPM request for the whole tag list."""
+        if self.chunks is not None:
+            return self.chunks
+        if self.segmented is None or self.max_apdu is None:
+            i_ams = await self.app.who_is(address=self.address)
+            if i_ams:
+                if self.segmented is None:
+                    self.segmented = i_ams[0].segmentationSupported in SEGMENTED_TRANSMIT
+                if self.max_apdu is None:
+                    self.max_apdu = i_ams[0].maxAPDULengthAccepted
+        own_max = self.app.device_object.maxApduLengthAccepted if self.app.device_object else 1024
+        budget = min(self.max_apdu or 480, own_max)
+        if self.segmented:
+            budget *= getattr(self.app.device_object, "maxSegmentsAccepted", None) or 16
+        self.chunks = self.split(self.specs(list(self.tags)), budget)
+        return self.chunks
+
+    def specs(self, names: List[str]) -> Spec:
+        """Group tags by object, keeping first-seen order."""
+        by_object: Dict[ObjectIdentifier, List[PropertyIdentifier]] = {}
+        for name in names:
+            oid, prop = self.tags[name]
+            by_object.setdefault(oid, []).append(prop)
+        return list(by_object.items())
+
+    @staticmethod
+    def split(specs: Spec, budget: int) -> List[Spec]:
+        chunks: List[Spec] = []
+        chunk: Spec = []
+        size = APDU_HEADER_BYTES
+        for oid, props in specs:
+            cost = OBJECT_BYTES + PROPERTY_BYTES * len(props)
+            if chunk and size + cost > budget:
+                chunks.append(chunk)
+                chunk, size = [], APDU_HEADER_BYTES
+            chunk.append((oid, props))
+            size += cost
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    async def read_chunk(self, chunk: Spec) -> List[tuple]:
+        parameters: list = []
+        for oid, props in chunk:
+            parameters.extend((oid, props))
+        try:
+            results = await self.app.read_property_multiple(self.address, parameters)
+        except AbortPDU as abort:
+            results = abort
+        if isinstance(results, AbortPDU) and results.apduAbortRejectReason in SPLIT_ON_ABORT:
+            if len(chunk) == 1:
+                raise RuntimeError(f"one object's properties do not fit an APDU: {chunk[0][0]}")
+            half = len(chunk) // 2
+            return await self.read_chunk(chunk[:half]) + await self.read_chunk(chunk[half:])
+        if not isinstance(results, list):
+            raise RuntimeError(f"ReadPropertyMultiple failed: {results}")
+        return results
+
+    async def read(self, names: Optional[List[str]] = None) -> Dict[str, object]:
+        """Values of every tag (or of names), one RPM per planned chunk; a property the
+        peer could not read comes back as its ErrorType."""
+        if names is None:
+            chunks = await self.plan()
+        else:
+            await self.plan()
+            chunks = [self.specs(names)]
+        values = {}
+        for chunk in chunks:
+            for oid, prop, _, value in await self.read_chunk(chunk):
+                values[(oid, prop)] = value
+        return {name: values.get(key) for name, key in self.tags.items() if names is None or name in names}
+
+    async def write(self, values: Dict[str, object], priority: Optional[int] = None) -> None:
+        """All values in one WritePropertyMultiple request, each cast to its property's type."""
+        specs: Dict[ObjectIdentifier, List[PropertyValue]] = {}
+        vendor_info = await self.app.get_vendor_info(device_address=self.address)
+        for name, value in values.items():
+            oid, prop = self.tags[name]
+            datatype = vendor_info.get_object_class(oid[0]).get_property_type(prop)
+            prop_value = PropertyValue(propertyIdentifier=prop, value=Any(datatype(value)))
+            if priority is not None:
+                prop_value.priority = priority
+            specs.setdefault(oid, []).append(prop_value)
+        request = WritePropertyMultipleRequest(
+            listOfWriteAccessSpecs=[
+                WriteAccessSpecification(objectIdentifier=oid, listOfProperties=props) for oid, props in specs.items()
+            ],
+            destination=self.address,
+        )
+        await self.app.request(request)
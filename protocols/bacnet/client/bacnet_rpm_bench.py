@@ -0,0 +1,89 @@
+import asyncio
+import os
+import socket
+import time
+from typing import Awaitable, Callable, Dict
+
+from bacpypes3.app import Application
+from bacpypes3.argparse import SimpleArgumentParser
+from bacpypes3.pdu import Address
+from bacpypes3.primitivedata import ObjectIdentifier
+
+from bacnet_cov_bench import Traffic
+from bacnet_rpm import LAB_TAGS, TagBatch
+
+TARGET = os.environ.get("BACNET_TARGET", "proto-server-bacnet")
+# Local bind; port 47809 to avoid conflict with the server.
+ADDRESS = os.environ.get("BACNET_BENCH_ADDRESS", "0.0.0.0/24:47809")
+CYCLES = int(os.environ.get("BACNET_BENCH_CYCLES", "50"))
+# Largest APDU this client accepts; 1476 is the BACnet/IP maximum.
+MAX_APDU = int(os.environ.get("BACNET_BENCH_MAX_APDU", "1476"))
+# The wide tag list reads these properties of every object.
+WIDE_PROPERTIES = ["presentValue", "statusFlags", "objectName", "objectType"]
+# AO_02/AO_03 feed nothing and AO_04 only mirrors to AI_04, so writes leave the counters alone.
+SETPOINTS = ["AO_02", "AO_03", "AO_04"]
+
+
+async def run_case(traffic: Traffic, cycle: Callable[[int], Awaitable[None]]) -> Dict[str, float]:
+    await cycle(0)  # warm-up: I-Am, vendor info, chunk plan
+    before = traffic.snapshot()
+    start = time.perf_counter()
+    for step in range(1, CYCLES + 1):
+        await cycle(step)
+    elapsed = time.perf_counter() - start
+    sent, received, sent_bytes, received_bytes = (b - a for a, b in zip(before, traffic.snapshot()))
+    return {
+        "ms": elapsed / CYCLES * 1000,
+        "out": sent / CYCLES,
+        "in": received / CYCLES,
+        "bytes": (sent_bytes + received_bytes) / CYCLES,
+    }
+
+
+async def main() -> None:
+    args = SimpleArgumentParser().parse_args(["--address", ADDRESS, "--instance", "999"])
+    app = Application.from_args(args)
+    app.device_object.maxApduLengthAccepted = MAX_APDU
+    traffic = Traffic(app)
+    target = Address(socket.gethostbyname(TARGET))
+
+    wide_tags = {
+        f"{name}.{prop}": (oid, prop) for name, (oid, _) in LAB_TAGS.items() for prop in WIDE_PROPERTIES
+    }
+    point_refs = [(ObjectIdentifier(oid), prop) for oid, prop in LAB_TAGS.values()]
+    wide_refs = [(ObjectIdentifier(oid), prop) for oid, prop in wide_tags.values()]
+    points = TagBatch(app, target, LAB_TAGS)
+    wide = TagBatch(app, target, wide_tags)
+    wide_unsegmented = TagBatch(app, target, wide_tags, segmented=False)
+
+    async def read_each(refs) -> None:
+        for oid, prop in refs:
+            await app.read_property(target, oid, prop)
+
+    async def write_each(step: int) -> None:
+        for name in SETPOINTS:
+            oid, prop = LAB_TAGS[name]
+            await app.write_property(target, ObjectIdentifier(oid), prop, float(step % 100))
+
+    async def write_batched(step: int) -> None:
+        await points.write({name: float(step % 100) for name in SETPOINTS})
+
+    cases = (
+        (f"ReadProperty x{len(point_refs)}", lambda step: read_each(point_refs)),
+        (f"RPM {len(point_refs)} values", lambda step: points.read()),
+        (f"ReadProperty x{len(wide_refs)}", lambda step: read_each(wide_refs)),
+        (f"RPM {len(wide_refs)}, segmented", lambda step: wide.read()),
+        (f"RPM {len(wide_refs)}, unsegmented", lambda step: wide_unsegmented.read()),
+        (f"WriteProperty x{len(SETPOINTS)}", write_each),
+        (f"WPM {len(SETPOINTS)} values", write_batched),
+    )
+    print(f"BACnet per-property vs multiple-property services ({TARGET}, {CYCLES} cycles, max APDU {MAX_APDU})")
+    print(f"{'cycle':<24} {'ms/cycle':>8} {'pkts out':>8} {'pkts in':>8} {'bytes':>7}")
+    for label, cycle in cases:
+        r = await run_case(traffic, cycle)
+        print(f"{label:<24} {r['ms']:>8.1f} {r['out']:>8.1f} {r['in']:>8.1f} {r['bytes']:>7.0f}")
+    app.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,12 +2,101 @@ import asyncio
 import os
 import socket
 import time
+from typing import Dict
 
 import BAC0
+from bacpypes3.apdu import ReadPropertyMultipleACK
+from bacpypes3.basetypes import PropertyIdentifier, ReadAccessResult
 from bacpypes3.local.analog import AnalogInputObject, AnalogOutputObject, AnalogValueObject
 from bacpypes3.local.binary import BinaryInputObject, BinaryOutputObject
+from bacpypes3.service.object import read_property_to_result_element
 
 THRESHOLD = 70.0
+TICK_INTERVAL = 0.2
+# SubscribeCOV: an analog object notifies once presentValue moves by its covIncrement.
+# BACNET_COV_INCREMENT applies to every AO/AI/AV; BACNET_COV_INCREMENTS overrides it per
+# object, e.g. "AI_01=0.5,TMR_01=10".
+COV_INCREMENT = float(os.environ.get("BACNET_COV_INCREMENT", "0.1"))
+COV_INCREMENTS = {
+    name: float(value)
+    for name, value in (item.split("=") for item in os.environ.get("BACNET_COV_INCREMENTS", "").split(",") if item)
+}
+
+
+def cov_increment(name: str) -> float:
+    return COV_INCREMENTS.get(name, COV_INCREMENT)
+
+
+class RpmCache:
+    """ReadPropertyMultiple fast path for pollers that send the same request over and over:
+    the read-access results for a request over the bench objects are built once and
+    reused until a write, or a presentValue/statusFlags change, clears them. Requests
+    for other objects or for all/required/optional go to the stock handler."""
+
+    WILDCARDS = (PropertyIdentifier.all, PropertyIdentifier.required, PropertyIdentifier.optional)
+    MAX_ENTRIES = 64
+
+    def __init__(self, app, objects) -> None:
+        self.app = app
+        self.objects = {obj.objectIdentifier: obj for obj in objects}
+        self.results: Dict[tuple, list] = {}
+        self.generation = 0
+        self.stock_read = app.do_ReadPropertyMultipleRequest
+        self.stock_write = app.do_WritePropertyRequest
+        self.stock_write_multiple = app.do_WritePropertyMultipleRequest
+        app.do_ReadPropertyMultipleRequest = self.read_multiple
+        app.do_WritePropertyRequest = self.write
+        app.do_WritePropertyMultipleRequest = self.write_multiple
+        for obj in objects:
+            for prop in ("presentValue", "statusFlags"):
+                obj._property_monitors[prop].append(self.invalidate)
+
+    def invalidate(self, *_) -> None:
+        self.generation += 1
+        self.results.clear()
+
+    def cacheable(self, key: tuple) -> bool:
+        return all(
+            oid in self.objects and not any(prop in self.WILDCARDS for prop, _ in refs) for oid, refs in key
+        )
+
+    async def read_multiple(self, apdu) -> None:
+        key = tuple(
+            (
+                spec.objectIdentifier,
+                tuple((ref.propertyIdentifier, ref.propertyArrayIndex) for ref in spec.listOfPropertyReferences),
+            )
+            for spec in apdu.listOfReadAccessSpecs
+        )
+        results = self.results.get(key)
+        if results is None:
+            if not self.cacheable(key):
+                await self.stock_read(apdu)
+                return
+            generation = self.generation
+            results = []
+            for oid, refs in key:
+                obj = self.objects[oid]
+                elements = [await read_property_to_result_element(obj, prop, index) for prop, index in refs]
+                results.append(ReadAccessResult(objectIdentifier=oid, listOfResults=elements))
+            # Only keep results nothing changed under while they were being read.
+            if generation == self.generation:
+                if len(self.results) >= self.MAX_ENTRIES:
+                    self.results.clear()
+                self.results[key] = results
+        await self.app.response(ReadPropertyMultipleACK(listOfReadAccessResults=results, context=apdu))
+
+    async def write(self, apdu) -> None:
+        try:
+            await self.stock_write(apdu)
+        finally:
+            self.invalidate()
+
+    async def write_multiple(self, apdu) -> None:
+        try:
+            await self.stock_write_multiple(apdu)
+        finally:
+            self.invalidate()
 
 
 async def main() -> None:
@@ -34,23 +123,45 @@ async def main() -> None:
         for i in range(1, 9)
     ]
     ao_objs = [
-        AnalogOutputObject(objectIdentifier=("analogOutput", i), objectName=f"AO_0{i}", presentValue=0.0)
+        AnalogOutputObject(
+            objectIdentifier=("analogOutput", i),
+            objectName=f"AO_0{i}",
+            presentValue=0.0,
+            covIncrement=cov_increment(f"AO_0{i}"),
+        )
         for i in range(1, 5)
     ]
     ai_objs = [
-        AnalogInputObject(objectIdentifier=("analogInput", i), objectName=f"AI_0{i}", presentValue=0.0)
+        AnalogInputObject(
+            objectIdentifier=("analogInput", i),
+            objectName=f"AI_0{i}",
+            presentValue=0.0,
+            covIncrement=cov_increment(f"AI_0{i}"),
+        )
         for i in range(1, 5)
     ]
-    tmr_obj = AnalogValueObject(objectIdentifier=("analogValue", 1), objectName="TMR_01", presentValue=0)
-    cnt_obj = AnalogValueObject(objectIdentifier=("analogValue", 2), objectName="CNT_01", presentValue=0)
+    tmr_obj = AnalogValueObject(
+        objectIdentifier=("analogValue", 1), objectName="TMR_01", presentValue=0, covIncrement=cov_increment("TMR_01")
+    )
+    cnt_obj = AnalogValueObject(
+        objectIdentifier=("analogValue", 2), objectName="CNT_01", presentValue=0, covIncrement=cov_increment("CNT_01")
+    )
 
     for obj in do_objs + di_objs + ao_objs + ai_objs + [tmr_obj, cnt_obj]:
         app.add_object(obj)
+    # RPM/WPM over all 26 objects: one APDU each way, and repeated polls reuse the results.
+    RpmCache(app, do_objs + di_objs + ao_objs + ai_objs + [tmr_obj, cnt_obj])
 
     print("BACnet objects:", ", ".join(str(oid) for oid in app.objectIdentifier.keys()))
 
     print("BACnet/IP server running on UDP/47808")
 
+    # Writes to the DOs/AOs wake the logic at once, so derived values (and the COV
+    # notifications they trigger) do not wait out the rest of the tick.
+    wake = asyncio.Event()
+    for obj in do_objs + ao_objs:
+        obj._property_monitors["presentValue"].append(lambda old, new: wake.set())
+
     prev_ao1 = float(ao_objs[0].presentValue)
     prev_do = [False] * 8
     timer = 0
@@ -100,7 +211,11 @@ async def main() -> None:
         cnt_obj.presentValue = crossing_count
 
         prev_do = current_do
-        await asyncio.sleep(0.2)
+        try:
+            await asyncio.wait_for(wake.wait(), TICK_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        wake.clear()
 
 
 if __name__ == "__main__":
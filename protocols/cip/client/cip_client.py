@@ -1,17 +1,49 @@
+import os
 import time
+
 from pycomm3 import LogixDriver
 
+CIP_HOST = os.environ.get("CIP_HOST", "proto-server-cip")
+# "demo" toggles DO_01/AO_01 as before; "bench" times array reads of CIP_BENCH_ARRAY.
+CIP_CLIENT_MODE = os.environ.get("CIP_CLIENT_MODE", "demo")
+ARRAY_TAG = os.environ.get("CIP_BENCH_ARRAY", "ARR_001")
+COUNTS = [int(c) for c in os.environ.get("CIP_BENCH_COUNTS", "100,1000").split(",")]
+ROUNDS = int(os.environ.get("CIP_BENCH_ROUNDS", "5"))
+
+
+def demo(plc: LogixDriver) -> None:
+    for step in range(3):
+        plc.write("DO_01", True)
+        plc.write("AO_01", 75 + step)
+        time.sleep(1)
+        ai = plc.read("AI_01")
+        print("AI_01", ai.value)
+        plc.write("DO_01", False)
+        time.sleep(1)
+
+
+def bench(plc: LogixDriver) -> None:
+    """pycomm3 switches to Read Tag Fragmented on its own once a reply exceeds one packet."""
+    print(f"pycomm3 array benchmark ({ARRAY_TAG} on {CIP_HOST}, best of {ROUNDS})")
+    print(f"{'elements':>9} {'ms/read':>9} {'elem/s':>9}")
+    for count in COUNTS:
+        best = None
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            tag = plc.read(f"{ARRAY_TAG}{{{count}}}")
+            elapsed = time.perf_counter() - start
+            if tag.error or len(tag.value) != count:
+                raise SystemExit(f"read of {ARRAY_TAG}{{{count}}} failed: {tag.error}")
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{count:>9} {best * 1000:>9.1f} {count / best:>9.0f}")
+
 
 def main() -> None:
-    with LogixDriver("proto-server-cip") as plc:
-        for step in range(3):
-            plc.write("DO_01", True)
-            plc.write("AO_01", 75 + step)
-            time.sleep(1)
-            ai = plc.read("AI_01")
-            print("AI_01", ai.value)
-            plc.write("DO_01", False)
-            time.sleep(1)
+    with LogixDriver(CIP_HOST) as plc:
+        if CIP_CLIENT_MODE == "bench":
+            bench(plc)
+        else:
+            demo(plc)
 
 
 if __name__ == "__main__":
@@ -1,18 +1,48 @@
+import asyncio
+import json
 import os
+import re
 import threading
 import time
-from typing import Any, Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 
+from cpppo.dotdict import dotdict
 from cpppo.server.enip import client
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from pydantic import BaseModel
 
 
-app = FastAPI()
-
 CIP_ADDRESS = os.environ.get("CIP_ADDRESS", "proto-server-cip")
+CIP_TIMEOUT = float(os.environ.get("CIP_TIMEOUT", "1.0"))
+CIP_POOL_SIZE = int(os.environ.get("CIP_POOL_SIZE", "4"))
+# Idle sessions older than this are probed with List Identity before reuse.
+CIP_HEALTH_CHECK_IDLE = float(os.environ.get("CIP_HEALTH_CHECK_IDLE", "5.0"))
+# Requests waiting for a CIP worker beyond this are refused with 503.
+CIP_MAX_QUEUE = int(os.environ.get("CIP_MAX_QUEUE", "256"))
+# Bytes per Multiple Service Packet (0 sends one request per tag) and requests in flight.
+CIP_MULTIPLE = int(os.environ.get("CIP_MULTIPLE", "500"))
+CIP_DEPTH = int(os.environ.get("CIP_DEPTH", "1"))
+# "explicit" polls tags over pooled unconnected sessions; "connected" holds a Forward Open
+# session to an embedded cip_server.py and reads its ASM_IN assembly once per CIP_RPI_MS.
+CIP_IO_MODE = os.environ.get("CIP_IO_MODE", "explicit")
+CIP_RPI = float(os.environ.get("CIP_RPI_MS", "50")) / 1000
+CIP_RECONNECT_DELAY = float(os.environ.get("CIP_RECONNECT_DELAY", "2.0"))
+# POST /tags writes arriving within this window go out as one CIP request.
+CIP_WRITE_WINDOW = float(os.environ.get("CIP_WRITE_WINDOW", "0.02"))
+CIP_POLL_INTERVAL = float(os.environ.get("CIP_POLL_INTERVAL", "0.2"))
+# GET /tags answers 503 once the last good snapshot is older than this.
+CIP_SNAPSHOT_MAX_AGE = float(os.environ.get("CIP_SNAPSHOT_MAX_AGE", "5.0"))
+# "gateway" derives DI/AI/TMR/CNT here and writes the DO_05 reset back; "server" reads all
+# tags from an embedded cip_server.py that already applies the bench logic.
+CIP_BENCH_LOGIC = os.environ.get("CIP_BENCH_LOGIC", "gateway")
+# Read Tag Fragmented reply payload per request (fits a 500-byte unconnected message).
+CIP_FRAGMENT_BYTES = int(os.environ.get("CIP_FRAGMENT_BYTES", "488"))
+CIP_MAX_ARRAY_ELEMENTS = int(os.environ.get("CIP_MAX_ARRAY_ELEMENTS", "10000"))
 THRESHOLD = 70
 MAX_INT = 32767
+INT_SIZE = 2
 
 DO_IDS = [f"c_do_{i:02d}" for i in range(1, 9)]
 DI_IDS = [f"c_di_{i:02d}" for i in range(1, 9)]
@@ -31,8 +61,14 @@ TAG_MAP["c_tmr_01"] = "TMR_01"
 TAG_MAP["c_cnt_01"] = "CNT_01"
 
 WRITABLE_PREFIXES = ("c_do_", "c_ao_")
-
-STATE_LOCK = threading.Lock()
+BOOL_PREFIXES = ("c_do_", "c_di_")
+# Input assembly served by cip_server.py in embedded mode:
+#   [0] DO bits  [1] DI bits  [2-5] AO_01..04  [6-9] AI_01..04  [10] TMR_01  [11] CNT_01
+ASSEMBLY_TAG = "ASM_IN"
+ASSEMBLY_SIZE = 12
+TAG_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# Only the poller thread touches STATE.
 STATE = {
     "prev_do": [False] * 8,
     "prev_ao1": 0,
@@ -42,6 +78,20 @@ STATE = {
     "last_tick": time.monotonic(),
 }
 
+# Latest poll result as (serialized body, wall-clock time); replaced whole by the poller.
+SNAPSHOT: Dict[str, Any] = {"latest": None, "error": None, "polls": 0, "failures": 0}
+POLL_WAKE = threading.Event()
+POLL_STOP = threading.Event()
+
+# Parsed write operation per tag, reused with new data instead of re-parsing strings.
+WRITE_TEMPLATES: Dict[str, Dict[str, Any]] = {}
+# Last value read from or written to each writable tag; bumped WRITE_SEQ marks polls that
+# started before a write so they cannot overwrite it with a stale value.
+KNOWN_VALUES: Dict[str, int] = {}
+WRITE_SEQ = {"value": 0}
+
+T = TypeVar("T")
+
 
 class TagWrite(BaseModel):
     id: str
@@ -55,6 +105,173 @@ def parse_address(address: str) -> Tuple[str, int]:
     return address, 44818
 
 
+class SessionPool:
+    """Registered EtherNet/IP sessions kept open and shared across requests.
+
+    A session is checked out for one request at a time, so a connector never has two
+    transactions interleaved.  A session that raises is closed instead of returned; if it
+    was a reused one, the work is retried once on a freshly registered session.
+    """
+
+    def __init__(self, address: str, size: int, timeout: float, health_check_idle: float) -> None:
+        self.host, self.port = parse_address(address)
+        self.timeout = timeout
+        self.health_check_idle = health_check_idle
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle: List[Tuple[float, client.connector]] = []
+        self.stats = {"opened": 0, "reused": 0, "discarded": 0, "health_checks": 0}
+
+    def _open(self) -> client.connector:
+        connection = client.connector(host=self.host, port=self.port, timeout=self.timeout)
+        with self._lock:
+            self.stats["opened"] += 1
+        return connection
+
+    def _discard(self, connection: client.connector) -> None:
+        with self._lock:
+            self.stats["discarded"] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _healthy(self, connection: client.connector) -> bool:
+        with self._lock:
+            self.stats["health_checks"] += 1
+        try:
+            with connection:
+                connection.list_identity(timeout=self.timeout)
+                response, _ = client.await_response(connection, timeout=self.timeout)
+            return response is not None and response.enip.status == 0
+        except Exception:
+            return False
+
+    def _checkout(self) -> Tuple[client.connector, bool]:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                released, connection = self._idle.pop()
+            if time.monotonic() - released < self.health_check_idle or self._healthy(connection):
+                with self._lock:
+                    self.stats["reused"] += 1
+                return connection, True
+            self._discard(connection)
+        return self._open(), False
+
+    def run(self, work: Callable[[client.connector], T]) -> T:
+        if not self._slots.acquire(timeout=self.timeout):
+            raise RuntimeError("no CIP session available")
+        try:
+            connection, reused = self._checkout()
+            try:
+                with connection:
+                    result = work(connection)
+            except Exception:
+                self._discard(connection)
+                if not reused:
+                    raise
+                # The server may have dropped an idle session; reconnect once.
+                connection = self._open()
+                try:
+                    with connection:
+                        result = work(connection)
+                except Exception:
+                    self._discard(connection)
+                    raise
+            with self._lock:
+                self._idle.append((time.monotonic(), connection))
+            return result
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for _, connection in idle:
+            connection.close()
+
+
+class CipExecutor:
+    """Bounded worker threads for blocking CIP calls made on behalf of HTTP requests.
+
+    Endpoints await these workers instead of running in FastAPI's shared threadpool, so a
+    stalled PLC ties up at most `workers` threads while further requests wait in a queue
+    of at most `max_queue` entries.
+    """
+
+    def __init__(self, workers: int, max_queue: int) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cip-io")
+        self._lock = threading.Lock()
+        self.max_queue = max_queue
+        self.stats: Dict[str, Any] = {
+            "workers": workers,
+            "queued": 0,
+            "running": 0,
+            "completed": 0,
+            "rejected": 0,
+            "last_wait_ms": 0.0,
+            "max_wait_ms": 0.0,
+        }
+
+    def _call(self, submitted: float, work: Callable[[], T]) -> T:
+        wait_ms = (time.perf_counter() - submitted) * 1000
+        with self._lock:
+            self.stats["queued"] -= 1
+            self.stats["running"] += 1
+            self.stats["last_wait_ms"] = wait_ms
+            self.stats["max_wait_ms"] = max(self.stats["max_wait_ms"], wait_ms)
+        try:
+            return work()
+        finally:
+            with self._lock:
+                self.stats["running"] -= 1
+                self.stats["completed"] += 1
+
+    async def run(self, work: Callable[[], T]) -> T:
+        with self._lock:
+            if self.stats["queued"] >= self.max_queue:
+                self.stats["rejected"] += 1
+                raise RuntimeError("CIP request queue full")
+            self.stats["queued"] += 1
+        future = self._executor.submit(self._call, time.perf_counter(), work)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # wrap_future already tried to cancel; only a never-started call is still counted.
+            if future.cancelled():
+                with self._lock:
+                    self.stats["queued"] -= 1
+            raise
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+POOL = SessionPool(CIP_ADDRESS, CIP_POOL_SIZE, CIP_TIMEOUT, CIP_HEALTH_CHECK_IDLE)
+# One pooled session stays with the poller thread.
+EXECUTOR = CipExecutor(max(CIP_POOL_SIZE - 1, 1), CIP_MAX_QUEUE)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    target = connected_loop if CIP_IO_MODE == "connected" else poll_loop
+    poller = threading.Thread(target=target, name="cip-poller", daemon=True)
+    poller.start()
+    try:
+        yield
+    finally:
+        POLL_STOP.set()
+        POLL_WAKE.set()
+        poller.join(timeout=CIP_TIMEOUT * 2)
+        EXECUTOR.shutdown()
+        POOL.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
 def parse_values(values: List[Any]) -> List[Any]:
     parsed = []
     for value in values:
@@ -65,9 +282,44 @@ def parse_values(values: List[Any]) -> List[Any]:
     return parsed
 
 
+def read_server_tags(connection) -> List[Dict[str, Any]]:
+    operations = client.parse_operations(list(TAG_MAP.values()))
+    failures, values = connection.process(operations, timeout=CIP_TIMEOUT, depth=CIP_DEPTH, multiple=CIP_MULTIPLE)
+    if failures:
+        raise RuntimeError("CIP read failed")
+    results: List[Dict[str, Any]] = []
+    for tag_id, value in zip(TAG_MAP, parse_values(values)):
+        results.append({"id": tag_id, "value": bool(value) if tag_id.startswith(BOOL_PREFIXES) else int(value or 0)})
+    return results
+
+
+def open_io_connection() -> client.implicit:
+    """Forward Open a connected session whose O->T/T->O RPI is CIP_RPI."""
+    host, port = parse_address(CIP_ADDRESS)
+    rpi_us = int(CIP_RPI * 1_000_000)
+    return client.implicit(host=host, port=port, timeout=CIP_TIMEOUT, O_T=dotdict(RPI=rpi_us), T_O=dotdict(RPI=rpi_us))
+
+
+def read_assembly(connection) -> List[Dict[str, Any]]:
+    operations = client.parse_operations([f"{ASSEMBLY_TAG}[0-{ASSEMBLY_SIZE - 1}]"])
+    failures, values = connection.process(operations, timeout=CIP_TIMEOUT, depth=1)
+    if failures:
+        raise RuntimeError("CIP assembly read failed")
+    assembly = [int(value) for value in values[0]]
+    do_bits, di_bits = assembly[0], assembly[1]
+    results: List[Dict[str, Any]] = []
+    for idx, tag_id in enumerate(DO_IDS):
+        results.append({"id": tag_id, "value": bool(do_bits >> idx & 1)})
+    for idx, tag_id in enumerate(DI_IDS):
+        results.append({"id": tag_id, "value": bool(di_bits >> idx & 1)})
+    for tag_id, value in zip(AO_IDS + AI_IDS + ["c_tmr_01", "c_cnt_01"], assembly[2:]):
+        results.append({"id": tag_id, "value": value})
+    return results
+
+
 def read_do_ao(connection) -> Tuple[List[bool], List[int]]:
     operations = client.parse_operations(READ_TAGS)
-    failures, values = connection.process(operations, timeout=1.0, depth=1)
+    failures, values = connection.process(operations, timeout=CIP_TIMEOUT, depth=CIP_DEPTH, multiple=CIP_MULTIPLE)
     if failures:
         raise RuntimeError("CIP read failed")
     parsed = parse_values(values)
@@ -76,15 +328,37 @@ def read_do_ao(connection) -> Tuple[List[bool], List[int]]:
     return do_vals, ao_vals
 
 
-def write_tags(connection, tag_values: List[str]) -> None:
-    if not tag_values:
+def write_operation(tag_name: str, cip_type: str, value: int) -> Dict[str, Any]:
+    template = WRITE_TEMPLATES.get(tag_name)
+    if template is None:
+        template = next(iter(client.parse_operations([f"{tag_name}=({cip_type})0"])))
+        WRITE_TEMPLATES[tag_name] = template
+    return dict(template, data=[value])
+
+
+def write_tags(connection, operations: List[Dict[str, Any]]) -> None:
+    if not operations:
         return
-    operations = client.parse_operations(tag_values)
-    failures, _ = connection.process(operations, timeout=1.0, depth=1)
+    failures, _ = connection.process(operations, timeout=CIP_TIMEOUT, depth=CIP_DEPTH, multiple=CIP_MULTIPLE)
     if failures:
         raise RuntimeError("CIP write failed")
 
 
+def read_int_array(connection, tag: str, count: int) -> List[int]:
+    """Read tag[0..count-1] as Read Tag Fragmented requests, one per CIP_FRAGMENT_BYTES offset."""
+    last = count - 1
+    operations = client.parse_operations(
+        [f"{tag}[0-{last}]+{offset}" for offset in range(0, count * INT_SIZE, CIP_FRAGMENT_BYTES)]
+    )
+    failures, values = connection.process(operations, timeout=CIP_TIMEOUT, depth=CIP_DEPTH, fragment=True)
+    if failures:
+        raise RuntimeError(f"CIP read of {tag} failed")
+    elements = [int(value) for fragment in values for value in fragment]
+    if len(elements) != count:
+        raise RuntimeError(f"CIP read of {tag} returned {len(elements)} of {count} elements")
+    return elements
+
+
 def update_state(do_vals: List[bool], ao_vals: List[int]) -> Tuple[List[bool], int, int, int, bool]:
     prev_do = STATE["prev_do"]
     prev_ao1 = STATE["prev_ao1"]
@@ -151,31 +425,167 @@ def build_response(do_vals: List[bool], ao_vals: List[int], timer: int, switch_c
     return results
 
 
+def poll_once(connection) -> List[Dict[str, Any]]:
+    do_vals, ao_vals = read_do_ao(connection)
+    do_vals, timer, switch_count, thresh_count, reset_requested = update_state(do_vals, ao_vals)
+
+    if reset_requested:
+        reset_ops = [write_operation(f"DO_0{i}", "BOOL", int(do_vals[i - 1])) for i in range(1, 6)]
+        write_tags(connection, reset_ops)
+    return build_response(do_vals, ao_vals, timer, switch_count, thresh_count)
+
+
+def publish_snapshot(tags: List[Dict[str, Any]], write_seq: int) -> None:
+    SNAPSHOT["latest"] = (json.dumps(tags, separators=(",", ":")).encode(), time.time())
+    SNAPSHOT["error"] = None
+    if WRITE_SEQ["value"] == write_seq:
+        for tag in tags:
+            if tag["id"].startswith(WRITABLE_PREFIXES):
+                KNOWN_VALUES[TAG_MAP[tag["id"]]] = int(tag["value"])
+
+
+def poll_loop() -> None:
+    """Refresh SNAPSHOT at CIP_POLL_INTERVAL so PLC traffic does not scale with HTTP clients."""
+    while not POLL_STOP.is_set():
+        write_seq = WRITE_SEQ["value"]
+        try:
+            tags = POOL.run(read_server_tags if CIP_BENCH_LOGIC == "server" else poll_once)
+        except Exception as exc:
+            SNAPSHOT["error"] = str(exc)
+            SNAPSHOT["failures"] += 1
+        else:
+            publish_snapshot(tags, write_seq)
+        SNAPSHOT["polls"] += 1
+        POLL_WAKE.wait(CIP_POLL_INTERVAL)
+        POLL_WAKE.clear()
+
+
+def connected_loop() -> None:
+    """Read the input assembly over one Forward Open session on a fixed CIP_RPI schedule.
+
+    cpppo cannot produce UDP class 1 I/O, so the cycle is driven from here over the
+    connected (class 3) transport; cycles are scheduled on absolute deadlines so a slow
+    read does not shift the ones after it.
+    """
+    while not POLL_STOP.is_set():
+        try:
+            connection = open_io_connection()
+        except Exception as exc:
+            SNAPSHOT["error"] = f"Forward Open failed: {exc}"
+            SNAPSHOT["failures"] += 1
+            POLL_STOP.wait(CIP_RECONNECT_DELAY)
+            continue
+        try:
+            deadline = time.monotonic()
+            while not POLL_STOP.is_set():
+                write_seq = WRITE_SEQ["value"]
+                with connection:
+                    tags = read_assembly(connection)
+                publish_snapshot(tags, write_seq)
+                SNAPSHOT["polls"] += 1
+                deadline = max(deadline + CIP_RPI, time.monotonic())
+                POLL_STOP.wait(deadline - time.monotonic())
+        except Exception as exc:
+            SNAPSHOT["error"] = str(exc)
+            SNAPSHOT["failures"] += 1
+        finally:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+
+class WriteBatcher:
+    """Coalesces POST /tags writes arriving within `window` into one CIP request.
+
+    A later value for a tag replaces an earlier one still pending, and a value equal to the
+    last value written (or being written) is dropped unless a different value for that tag
+    is pending. Batches go to the PLC one at a time, in the order they were closed.
+    """
+
+    def __init__(self, window: float) -> None:
+        self.window = window
+        self._pending: Dict[str, Tuple[str, int]] = {}
+        self._batch: Optional[asyncio.Future] = None
+        # Values of closed batches not yet confirmed by the PLC, latest batch wins.
+        self._sending: Dict[str, int] = {}
+        self._flush_lock = asyncio.Lock()
+        self.stats = {"requested": 0, "suppressed": 0, "coalesced": 0, "batches": 0, "written": 0}
+
+    async def write(self, writes: List[Tuple[str, str, int]]) -> Tuple[int, int]:
+        """Queue (tag, CIP type, value) writes and wait for their batch; returns (sent, suppressed)."""
+        sent = suppressed = 0
+        for tag_name, cip_type, value in writes:
+            self.stats["requested"] += 1
+            if tag_name in self._pending:
+                self.stats["coalesced"] += 1
+            elif self._sending.get(tag_name, KNOWN_VALUES.get(tag_name)) == value:
+                self.stats["suppressed"] += 1
+                suppressed += 1
+                continue
+            self._pending[tag_name] = (cip_type, value)
+            sent += 1
+        if not sent:
+            return sent, suppressed
+
+        if self._batch is None:
+            loop = asyncio.get_running_loop()
+            self._batch = loop.create_future()
+            loop.call_later(self.window, lambda: loop.create_task(self._flush()))
+        await asyncio.shield(self._batch)
+        return sent, suppressed
+
+    async def _flush(self) -> None:
+        batch, self._batch = self._batch, None
+        pending, self._pending = self._pending, {}
+        for tag_name, (_, value) in pending.items():
+            self._sending[tag_name] = value
+        operations = [write_operation(tag_name, cip_type, value) for tag_name, (cip_type, value) in pending.items()]
+        # Lock waiters are woken first come, first served, so batches reach the PLC in order.
+        async with self._flush_lock:
+            WRITE_SEQ["value"] += 1
+            try:
+                await EXECUTOR.run(lambda: POOL.run(lambda connection: write_tags(connection, operations)))
+            except Exception as exc:
+                self._settle(pending)
+                batch.set_exception(exc)
+                return
+            for tag_name, (_, value) in pending.items():
+                KNOWN_VALUES[tag_name] = value
+            self._settle(pending)
+            # Polls that read while the write was on the wire must not publish what they saw.
+            WRITE_SEQ["value"] += 1
+        self.stats["batches"] += 1
+        self.stats["written"] += len(operations)
+        batch.set_result(None)
+        # Refresh the snapshot now rather than at the next interval.
+        POLL_WAKE.set()
+
+    def _settle(self, pending: Dict[str, Tuple[str, int]]) -> None:
+        for tag_name, (_, value) in pending.items():
+            if self._sending.get(tag_name) == value:
+                del self._sending[tag_name]
+
+
+WRITES = WriteBatcher(CIP_WRITE_WINDOW)
+
+
 @app.get("/tags")
-def get_tags() -> List[Dict[str, Any]]:
-    host, port = parse_address(CIP_ADDRESS)
-    connection = client.connector(host=host, port=port, timeout=1.0)
-    try:
-        with connection:
-            do_vals, ao_vals = read_do_ao(connection)
-            with STATE_LOCK:
-                do_vals, timer, switch_count, thresh_count, reset_requested = update_state(do_vals, ao_vals)
-
-            ao1 = int(ao_vals[0])
-            ao4 = int(ao_vals[3])
-            if reset_requested:
-                reset_ops = [f"DO_0{i}=(BOOL){int(do_vals[i - 1])}" for i in range(1, 6)]
-                write_tags(connection, reset_ops)
-            return build_response(do_vals, ao_vals, timer, switch_count, thresh_count)
-    except Exception as exc:
-        raise HTTPException(status_code=503, detail=str(exc)) from exc
-    finally:
-        connection.close()
+async def get_tags() -> Response:
+    latest = SNAPSHOT["latest"]
+    if latest is None:
+        raise HTTPException(status_code=503, detail=SNAPSHOT["error"] or "no CIP snapshot yet")
+    body, updated = latest
+    age = time.time() - updated
+    if age > CIP_SNAPSHOT_MAX_AGE:
+        raise HTTPException(status_code=503, detail=f"CIP snapshot stale ({age:.1f}s): {SNAPSHOT['error']}")
+    headers = {"X-Snapshot-Time": f"{updated:.3f}", "X-Snapshot-Age": f"{age:.3f}"}
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @app.post("/tags")
-def set_tags(payload: List[TagWrite]) -> Dict[str, Any]:
-    writes = []
+async def set_tags(payload: List[TagWrite]) -> Dict[str, Any]:
+    writes: List[Tuple[str, str, int]] = []
     for item in payload:
         tag_id = item.id
         tag_name = TAG_MAP.get(tag_id)
@@ -185,26 +595,39 @@ def set_tags(payload: List[TagWrite]) -> Dict[str, Any]:
             continue
         value = item.value
         if tag_id.startswith("c_ao_"):
-            value = min(max(int(float(value)), 0), MAX_INT)
-            writes.append(f"{tag_name}=(INT){value}")
+            writes.append((tag_name, "INT", min(max(int(float(value)), 0), MAX_INT)))
         elif tag_id.startswith("c_do_"):
-            value = int(bool(value))
-            writes.append(f"{tag_name}=(BOOL){value}")
+            writes.append((tag_name, "BOOL", int(bool(value))))
 
-    if writes:
-        host, port = parse_address(CIP_ADDRESS)
-        connection = client.connector(host=host, port=port, timeout=1.0)
-        try:
-            with connection:
-                write_tags(connection, writes)
-        except Exception as exc:
-            raise HTTPException(status_code=503, detail=str(exc)) from exc
-        finally:
-            connection.close()
+    try:
+        written, suppressed = await WRITES.write(writes)
+    except Exception as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
 
-    return {"status": "ok", "written": len(writes)}
+    return {"status": "ok", "written": written, "suppressed": suppressed}
+
+
+@app.get("/arrays/{tag}")
+async def get_array(tag: str, count: int = 1000) -> Dict[str, Any]:
+    if not TAG_NAME.match(tag) or not 1 <= count <= CIP_MAX_ARRAY_ELEMENTS:
+        raise HTTPException(status_code=400, detail="invalid tag or count")
+    try:
+        values = await EXECUTOR.run(lambda: POOL.run(lambda connection: read_int_array(connection, tag, count)))
+    except Exception as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    return {"tag": tag, "count": count, "values": values}
 
 
 @app.get("/health")
-def health() -> Dict[str, str]:
-    return {"status": "ok"}
+async def health() -> Dict[str, Any]:
+    latest = SNAPSHOT["latest"]
+    return {
+        "status": "ok",
+        "pool": POOL.stats,
+        "executor": EXECUTOR.stats,
+        "writes": WRITES.stats,
+        "snapshot_age": time.time() - latest[1] if latest is not None else None,
+        "polls": SNAPSHOT["polls"],
+        "poll_failures": SNAPSHOT["failures"],
+        "poll_error": SNAPSHOT["error"],
+    }
@@ -0,0 +1,55 @@
+import json
+import os
+import time
+import urllib.request
+from typing import Callable, List
+
+from cpppo.server.enip import client
+
+from app import CIP_ADDRESS, CIP_FRAGMENT_BYTES, CIP_TIMEOUT, INT_SIZE, parse_address, read_int_array
+
+GATEWAY_URL = os.environ.get("CIP_GATEWAY_URL", "http://localhost:9000")
+ARRAY_TAG = os.environ.get("CIP_BENCH_ARRAY", "ARR_001")
+COUNTS = [int(c) for c in os.environ.get("CIP_BENCH_COUNTS", "100,1000").split(",")]
+ROUNDS = int(os.environ.get("CIP_BENCH_ROUNDS", "5"))
+
+
+def best_of(read: Callable[[], List[int]], count: int) -> float:
+    best = None
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        values = read()
+        elapsed = time.perf_counter() - start
+        if len(values) != count:
+            raise SystemExit(f"read returned {len(values)} of {count} elements")
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main() -> None:
+    host, port = parse_address(CIP_ADDRESS)
+    connection = client.connector(host=host, port=port, timeout=CIP_TIMEOUT)
+    print(f"CIP fragmented array benchmark ({ARRAY_TAG} on {host}:{port}, best of {ROUNDS})")
+    print(f"{'elements':>9} {'fragments':>10} {'path':<8} {'ms/read':>9} {'elem/s':>9}")
+    try:
+        for count in COUNTS:
+            fragments = -(-count * INT_SIZE // CIP_FRAGMENT_BYTES)
+
+            def direct() -> List[int]:
+                with connection:
+                    return read_int_array(connection, ARRAY_TAG, count)
+
+            def gateway() -> List[int]:
+                url = f"{GATEWAY_URL}/arrays/{ARRAY_TAG}?count={count}"
+                with urllib.request.urlopen(url, timeout=30) as response:
+                    return json.loads(response.read())["values"]
+
+            for path, read in (("direct", direct), ("gateway", gateway)):
+                elapsed = best_of(read, count)
+                print(f"{count:>9} {fragments:>10} {path:<8} {elapsed * 1000:>9.1f} {count / elapsed:>9.0f}")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import os
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from cpppo.server.enip import client
+
+from app import CIP_ADDRESS, CIP_RPI, CIP_TIMEOUT, open_io_connection, parse_address, read_assembly, read_server_tags
+
+SECONDS = float(os.environ.get("CIP_BENCH_SECONDS", "5.0"))
+
+
+def run_cycles(connection, read: Callable[[object], List[Dict]]) -> Dict[str, float]:
+    """Read once per CIP_RPI on absolute deadlines; collect read latency and cycle periods."""
+    latencies: List[float] = []
+    starts: List[float] = []
+    values = 0
+    deadline = time.monotonic()
+    end = deadline + SECONDS
+    while deadline < end:
+        start = time.monotonic()
+        with connection:
+            values += len(read(connection))
+        latencies.append(time.monotonic() - start)
+        starts.append(start)
+        deadline = max(deadline + CIP_RPI, time.monotonic())
+        time.sleep(max(deadline - time.monotonic(), 0))
+    periods = [b - a for a, b in zip(starts, starts[1:])]
+    latencies.sort()
+    return {
+        "cycles": len(latencies),
+        "values_per_s": values / (starts[-1] - starts[0] + latencies[-1]),
+        "latency_ms": statistics.mean(latencies) * 1000,
+        "latency_p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "period_ms": statistics.mean(periods) * 1000,
+        "jitter_ms": statistics.pstdev(periods) * 1000,
+        "worst_ms": max(abs(p - CIP_RPI) for p in periods) * 1000,
+    }
+
+
+def main() -> None:
+    host, port = parse_address(CIP_ADDRESS)
+    print(f"CIP cyclic I/O benchmark ({host}:{port}, RPI {CIP_RPI * 1000:.0f} ms, {SECONDS:.0f}s per case)")
+    print(
+        f"{'transport':<22} {'cycles':>7} {'values/s':>9} {'lat ms':>7} {'p99 ms':>7} "
+        f"{'period':>7} {'jitter':>7} {'worst':>7}"
+    )
+    cases = (
+        ("explicit 26 tags", lambda: client.connector(host=host, port=port, timeout=CIP_TIMEOUT), read_server_tags),
+        ("connected ASM_IN", open_io_connection, read_assembly),
+    )
+    for name, connect, read in cases:
+        connection = connect()
+        try:
+            r = run_cycles(connection, read)
+        finally:
+            connection.close()
+        print(
+            f"{name:<22} {r['cycles']:>7} {r['values_per_s']:>9.0f} {r['latency_ms']:>7.1f} "
+            f"{r['latency_p99_ms']:>7.1f} {r['period_ms']:>7.1f} {r['jitter_ms']:>7.2f} {r['worst_ms']:>7.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
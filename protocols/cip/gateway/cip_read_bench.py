@@ -0,0 +1,52 @@
+import os
+import time
+from typing import List, Tuple
+
+from cpppo.server.enip import client
+
+from app import CIP_ADDRESS, CIP_TIMEOUT, parse_address
+
+DEPTHS = [int(d) for d in os.environ.get("CIP_BENCH_DEPTHS", "1,2,4,8").split(",")]
+MULTIPLES = [int(m) for m in os.environ.get("CIP_BENCH_MULTIPLES", "0,200,500").split(",")]
+# Reads per pass: the gateway's 12 DO/AO tags, repeated to emulate larger scans.
+REPEAT = int(os.environ.get("CIP_BENCH_REPEAT", "1"))
+SECONDS = float(os.environ.get("CIP_BENCH_SECONDS", "3.0"))
+
+READ_TAGS = [f"DO_0{i}" for i in range(1, 9)] + [f"AO_0{i}" for i in range(1, 5)]
+
+
+def run_case(connection, tags: List[str], depth: int, multiple: int) -> Tuple[int, float]:
+    """Read the tag list repeatedly for SECONDS; return (passes, seconds)."""
+    passes = 0
+    start = time.perf_counter()
+    while True:
+        operations = client.parse_operations(tags)
+        with connection:
+            failures, _ = connection.process(
+                operations, timeout=CIP_TIMEOUT, depth=depth, multiple=multiple
+            )
+        if failures:
+            raise SystemExit(f"{failures} failed reads at depth={depth} multiple={multiple}")
+        passes += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= SECONDS:
+            return passes, elapsed
+
+
+def main() -> None:
+    host, port = parse_address(CIP_ADDRESS)
+    tags = READ_TAGS * REPEAT
+    connection = client.connector(host=host, port=port, timeout=CIP_TIMEOUT)
+    print(f"CIP read benchmark ({host}:{port}, {len(tags)} tags per pass, {SECONDS:.0f}s per case)")
+    print(f"{'multiple':>9} {'depth':>6} {'ms/pass':>9} {'tags/s':>9}")
+    try:
+        for multiple in MULTIPLES:
+            for depth in DEPTHS:
+                passes, elapsed = run_case(connection, tags, depth, multiple)
+                print(f"{multiple:>9} {depth:>6} {elapsed / passes * 1000:>9.1f} {passes * len(tags) / elapsed:>9.0f}")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
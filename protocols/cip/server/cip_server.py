@@ -1,46 +1,190 @@
+import os
 import subprocess
 import sys
+import threading
+import time
+from typing import Dict, List
 
+from cpppo.server.enip import device
+from cpppo.server.enip.main import main as enip_main
 
-def main() -> None:
-    tag_defs = [
-        "DO_01=BOOL",
-        "DO_02=BOOL",
-        "DO_03=BOOL",
-        "DO_04=BOOL",
-        "DO_05=BOOL",
-        "DO_06=BOOL",
-        "DO_07=BOOL",
-        "DO_08=BOOL",
-        "DI_01=BOOL",
-        "DI_02=BOOL",
-        "DI_03=BOOL",
-        "DI_04=BOOL",
-        "DI_05=BOOL",
-        "DI_06=BOOL",
-        "DI_07=BOOL",
-        "DI_08=BOOL",
-        "AO_01=INT",
-        "AO_02=INT",
-        "AO_03=INT",
-        "AO_04=INT",
-        "AI_01=INT",
-        "AI_02=INT",
-        "AI_03=INT",
-        "AI_04=INT",
-        "TMR_01=INT",
-        "CNT_01=INT",
-    ]
+# "subprocess" runs the stock cpppo simulator with static tags; "embedded" serves the
+# same tags from this process with the bench logic applied at the server.
+CIP_SERVER_MODE = os.environ.get("CIP_SERVER_MODE", "subprocess")
+CIP_BIND = os.environ.get("CIP_BIND", "0.0.0.0:44818")
+# Extra tags for scale tests: BULK_00001.. scalar INTs and ARR_001.. INT arrays.
+CIP_BULK_TAGS = int(os.environ.get("CIP_BULK_TAGS", "0"))
+CIP_ARRAY_TAGS = int(os.environ.get("CIP_ARRAY_TAGS", "0"))
+CIP_ARRAY_LENGTH = int(os.environ.get("CIP_ARRAY_LENGTH", "1000"))
+TICK_INTERVAL = 0.2
+THRESHOLD = 70
+MAX_INT = 32767
+
+TAG_DEFS = [
+    "DO_01=BOOL",
+    "DO_02=BOOL",
+    "DO_03=BOOL",
+    "DO_04=BOOL",
+    "DO_05=BOOL",
+    "DO_06=BOOL",
+    "DO_07=BOOL",
+    "DO_08=BOOL",
+    "DI_01=BOOL",
+    "DI_02=BOOL",
+    "DI_03=BOOL",
+    "DI_04=BOOL",
+    "DI_05=BOOL",
+    "DI_06=BOOL",
+    "DI_07=BOOL",
+    "DI_08=BOOL",
+    "AO_01=INT",
+    "AO_02=INT",
+    "AO_03=INT",
+    "AO_04=INT",
+    "AI_01=INT",
+    "AI_02=INT",
+    "AI_03=INT",
+    "AI_04=INT",
+    "TMR_01=INT",
+    "CNT_01=INT",
+]
+
+
+# Fixed-layout input assembly for cyclic reads (embedded mode only):
+#   [0] DO bits  [1] DI bits  [2-5] AO_01..04  [6-9] AI_01..04  [10] TMR_01  [11] CNT_01
+ASSEMBLY_TAG = "ASM_IN"
+ASSEMBLY_SIZE = 12
+
+
+def generate_tag_defs(bulk_tags: int, array_tags: int, array_length: int) -> List[str]:
+    """Generated scale-test tags, served after the bench tags."""
+    tag_defs = [f"BULK_{idx:05d}=INT" for idx in range(1, bulk_tags + 1)]
+    tag_defs += [f"ARR_{idx:03d}=INT[{array_length}]" for idx in range(1, array_tags + 1)]
+    return tag_defs
+
+
+STATE = {
+    "prev_do": [0] * 8,
+    "prev_ao1": 0,
+    "timer": 0,
+    "switch_count": 0,
+    "thresh_count": 0,
+    "last_tick": time.monotonic(),
+}
+# cpppo serves every client connection on its own thread.
+STATE_LOCK = threading.RLock()
+ATTRIBUTES: Dict[str, device.Attribute] = {}
+
+
+class BenchAttribute(device.Attribute):
+    """Tag storage that re-runs the bench logic as soon as a DO/AO write lands."""
+
+    def __init__(self, name, type_cls, **kwds) -> None:
+        super().__init__(name, type_cls, **kwds)
+        ATTRIBUTES[name] = self
+
+    def __setitem__(self, key, value) -> None:
+        with STATE_LOCK:
+            super().__setitem__(key, value)
+            if self.name.startswith(("DO_", "AO_")):
+                update_state()
+
+
+def update_state() -> None:
+    do_attrs = [ATTRIBUTES[f"DO_0{i}"] for i in range(1, 9)]
+    do_vals = [int(attr.value) for attr in do_attrs]
+    ao_vals = [int(ATTRIBUTES[f"AO_0{i}"].value) for i in range(1, 5)]
+    prev_do = STATE["prev_do"]
+    prev_ao1 = int(STATE["prev_ao1"])
+    timer = int(STATE["timer"])
+    switch_count = int(STATE["switch_count"])
+    thresh_count = int(STATE["thresh_count"])
+    last_tick = float(STATE["last_tick"])
+
+    ao1 = ao_vals[0]
+    reset_requested = bool(do_vals[4]) and not bool(prev_do[4])
+    if reset_requested:
+        timer = 0
+        switch_count = 0
+        thresh_count = 0
+        for idx in range(5):
+            do_vals[idx] = 0
+            do_attrs[idx].value = 0
+        prev_ao1 = ao1
+        last_tick = time.monotonic()
+    else:
+        for idx in range(4):
+            if not prev_do[idx] and do_vals[idx]:
+                switch_count = min(switch_count + 1, MAX_INT)
+
+        if prev_ao1 <= THRESHOLD < ao1:
+            thresh_count = min(thresh_count + 1, MAX_INT)
+        prev_ao1 = ao1
+
+        now = time.monotonic()
+        if now - last_tick >= 1.0:
+            ticks = int(now - last_tick)
+            last_tick += ticks
+            if ao1 > THRESHOLD:
+                timer = min(timer + ticks, MAX_INT)
+
+    STATE["prev_do"] = do_vals
+    STATE["prev_ao1"] = prev_ao1
+    STATE["timer"] = timer
+    STATE["switch_count"] = switch_count
+    STATE["thresh_count"] = thresh_count
+    STATE["last_tick"] = last_tick
+
+    for idx in range(8):
+        ATTRIBUTES[f"DI_0{idx + 1}"].value = do_vals[idx]
+    ATTRIBUTES["AI_01"].value = ao1
+    ATTRIBUTES["AI_02"].value = switch_count
+    ATTRIBUTES["AI_03"].value = thresh_count
+    ATTRIBUTES["AI_04"].value = ao_vals[3]
+    ATTRIBUTES["TMR_01"].value = timer
+    ATTRIBUTES["CNT_01"].value = thresh_count
+
+    do_bits = sum(1 << idx for idx in range(8) if do_vals[idx])
+    ai_vals = [ao1, switch_count, thresh_count, ao_vals[3]]
+    ATTRIBUTES[ASSEMBLY_TAG].value[:] = [do_bits, do_bits, *ao_vals, *ai_vals, timer, thresh_count]
+
+
+def tick_loop() -> None:
+    """Advance the timer while nobody writes; writes update the state immediately."""
+    while True:
+        time.sleep(TICK_INTERVAL)
+        if ASSEMBLY_TAG not in ATTRIBUTES:
+            continue
+        with STATE_LOCK:
+            update_state()
+
+
+def run_embedded() -> None:
+    threading.Thread(target=tick_loop, name="cip-bench-tick", daemon=True).start()
+    tag_defs = [*TAG_DEFS, f"{ASSEMBLY_TAG}=INT[{ASSEMBLY_SIZE}]"]
+    tag_defs += generate_tag_defs(CIP_BULK_TAGS, CIP_ARRAY_TAGS, CIP_ARRAY_LENGTH)
+    enip_main(argv=["--address", CIP_BIND, *tag_defs], attribute_class=BenchAttribute)
+
+
+def run_subprocess() -> None:
     cmd = [
         sys.executable,
         "-m",
         "cpppo.server.enip",
         "--address",
-        "0.0.0.0:44818",
-        *tag_defs,
+        CIP_BIND,
+        *TAG_DEFS,
+        *generate_tag_defs(CIP_BULK_TAGS, CIP_ARRAY_TAGS, CIP_ARRAY_LENGTH),
     ]
     subprocess.run(cmd, check=True)
 
 
+def main() -> None:
+    if CIP_SERVER_MODE == "embedded":
+        run_embedded()
+    else:
+        run_subprocess()
+
+
 if __name__ == "__main__":
     main()
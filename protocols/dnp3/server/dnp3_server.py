@@ -1,13 +1,17 @@
-import threading
+import queue
 import time
-from typing import Dict, List
+from typing import Callable, Dict, List, Tuple
 
 from pydnp3 import asiodnp3, opendnp3, asiopal
 
 THRESHOLD = 70
 MAX_INT = 2**31 - 1
+TICK_INTERVAL = 1.0
+
+# Operate callbacks run on the stack's executor thread. They only decode the
+# command and enqueue it; the main loop is the single writer of STATE.
+COMMAND_QUEUE: "queue.SimpleQueue[Tuple[str, int, int]]" = queue.SimpleQueue()
 
-STATE_LOCK = threading.Lock()
 STATE: Dict[str, object] = {
     "do": [0] * 8,
     "ao": [0] * 4,
@@ -107,50 +111,73 @@ def tick_state(state: Dict[str, object]) -> None:
     state["last_tick"] = last_tick
 
 
-class CommandHandler(opendnp3.ICommandHandler):
-    def __init__(self) -> None:
-        super().__init__()
-        self._outstation = None
+CROB_ON_CODES = frozenset((opendnp3.ControlCode.LATCH_ON, opendnp3.ControlCode.PULSE_ON))
+
+
+def decode_crob(command) -> int:
+    return 1 if command.code in CROB_ON_CODES else 0
 
-    def set_outstation(self, outstation) -> None:
-        self._outstation = outstation
 
+def decode_analog(command) -> int:
+    return clamp_ao(command.value)
+
+
+# command type -> (state key, decoder)
+COMMAND_DISPATCH: Dict[type, Tuple[str, Callable[[object], int]]] = {
+    opendnp3.ControlRelayOutputBlock: ("do", decode_crob),
+    opendnp3.AnalogOutputInt16: ("ao", decode_analog),
+    opendnp3.AnalogOutputInt32: ("ao", decode_analog),
+    opendnp3.AnalogOutputFloat32: ("ao", decode_analog),
+    opendnp3.AnalogOutputDouble64: ("ao", decode_analog),
+}
+POINT_COUNTS = {"do": len(STATE["do"]), "ao": len(STATE["ao"])}
+
+
+def drain_commands(state: Dict[str, object], timeout: float) -> int:
+    """Apply queued commands, waiting up to timeout for the first one."""
+    applied = 0
+    try:
+        key, index, value = COMMAND_QUEUE.get(timeout=max(timeout, 0.0))
+    except queue.Empty:
+        return 0
+    while True:
+        state[key][index] = value
+        # Tick per command so quick on/off pairs still register as edges.
+        tick_state(state)
+        applied += 1
+        try:
+            key, index, value = COMMAND_QUEUE.get_nowait()
+        except queue.Empty:
+            return applied
+
+
+class CommandHandler(opendnp3.ICommandHandler):
     def Start(self) -> None:
         return None
 
     def End(self) -> None:
         return None
 
+    @staticmethod
+    def check(command, index):
+        """Return (dispatch entry, status): Select and Operate reject the same commands."""
+        entry = COMMAND_DISPATCH.get(type(command))
+        if entry is None:
+            return None, opendnp3.CommandStatus.NOT_SUPPORTED
+        if not 0 <= index < POINT_COUNTS[entry[0]]:
+            return None, opendnp3.CommandStatus.OUT_OF_RANGE
+        return entry, opendnp3.CommandStatus.SUCCESS
+
     def Select(self, command, index):
-        return opendnp3.CommandStatus.SUCCESS
+        return self.check(command, index)[1]
 
     def Operate(self, command, index, op_type):
-        with STATE_LOCK:
-            if isinstance(command, opendnp3.ControlRelayOutputBlock):
-                if 0 <= index < len(STATE["do"]):
-                    is_on = command.code in (
-                        opendnp3.ControlCode.LATCH_ON,
-                        opendnp3.ControlCode.PULSE_ON,
-                    )
-                    STATE["do"][index] = 1 if is_on else 0
-            elif isinstance(command, opendnp3.AnalogOutputInt16):
-                if 0 <= index < len(STATE["ao"]):
-                    STATE["ao"][index] = clamp_ao(command.value)
-            elif isinstance(command, opendnp3.AnalogOutputInt32):
-                if 0 <= index < len(STATE["ao"]):
-                    STATE["ao"][index] = clamp_ao(command.value)
-            elif isinstance(command, opendnp3.AnalogOutputFloat32):
-                if 0 <= index < len(STATE["ao"]):
-                    STATE["ao"][index] = clamp_ao(command.value)
-            elif isinstance(command, opendnp3.AnalogOutputDouble64):
-                if 0 <= index < len(STATE["ao"]):
-                    STATE["ao"][index] = clamp_ao(command.value)
-
-            if self._outstation:
-                snapshot = derive_snapshot(STATE)
-                apply_snapshot(self._outstation, snapshot)
-
-        return opendnp3.CommandStatus.SUCCESS
+        entry, status = self.check(command, index)
+        if entry is None:
+            return status
+        key, decode = entry
+        COMMAND_QUEUE.put((key, index, decode(command)))
+        return status
 
 
 def main() -> None:
@@ -185,21 +212,22 @@ def main() -> None:
         asiodnp3.DefaultOutstationApplication(),
         config,
     )
-    command_handler.set_outstation(outstation)
 
-    with STATE_LOCK:
-        snapshot = derive_snapshot(STATE)
-        apply_snapshot(outstation, snapshot)
+    apply_snapshot(outstation, derive_snapshot(STATE))
 
     outstation.Enable()
     print("DNP3 outstation listening on TCP/20000")
 
+    next_tick = time.monotonic() + TICK_INTERVAL
     while True:
-        time.sleep(1)
-        with STATE_LOCK:
+        applied = drain_commands(STATE, next_tick - time.monotonic())
+        now = time.monotonic()
+        if now >= next_tick:
             tick_state(STATE)
-            snapshot = derive_snapshot(STATE)
-        apply_snapshot(outstation, snapshot)
+            next_tick = max(next_tick + TICK_INTERVAL, now)
+        elif not applied:
+            continue
+        apply_snapshot(outstation, derive_snapshot(STATE))
 
 
 if __name__ == "__main__":
@@ -1,14 +1,65 @@
 import asyncio
+import os
+from typing import Dict
+
+from iec104_apdu import (
+    C_IC_NA_1,
+    C_SC_NA_1,
+    C_SE_NC_1,
+    COT_ACTIVATION,
+    M_ME_NC_1,
+    M_SP_NA_1,
+    QOI_STATION,
+    Asdu,
+    Connection,
+    InfoObject,
+    encode_asdu,
+)
+
+HOST = os.environ.get("IEC104_HOST", "proto-server-iec104")
+PORT = int(os.environ.get("IEC104_PORT", "2404"))
+COMMON_ADDRESS = int(os.environ.get("IEC104_COMMON_ADDRESS", "1"))
+
+DO_01_IOA = 1
+AO_01_IOA = 1001
+AI_01_IOA = 1101
+
+POINTS: Dict[int, float] = {}
+
+
+def on_asdu(conn: Connection, asdu: Asdu) -> None:
+    if asdu.negative:
+        print("IEC104 negative confirmation", asdu)
+    if asdu.type_id not in (M_SP_NA_1, M_ME_NC_1):
+        return
+    for obj in asdu.objects:
+        POINTS[obj.ioa] = obj.value
+
+
+def command(conn: Connection, type_id: int, ioa: int, value: float) -> None:
+    asdu = Asdu(type_id, COT_ACTIVATION, COMMON_ADDRESS, [InfoObject(ioa, value)])
+    conn.send_asdu(encode_asdu(asdu))
 
 
 async def main() -> None:
-    reader, writer = await asyncio.open_connection("proto-server-iec104", 2404)
-    writer.write(b"IEC104_TEST")
-    await writer.drain()
-    data = await reader.read(1024)
-    print("IEC104 reply", data)
-    writer.close()
-    await writer.wait_closed()
+    _, conn = await asyncio.get_running_loop().create_connection(lambda: Connection(on_asdu), HOST, PORT)
+    try:
+        await conn.start_data_transfer()
+        command(conn, C_IC_NA_1, 0, QOI_STATION)
+        await asyncio.sleep(1)
+        print("IEC104 interrogation", dict(sorted(POINTS.items())))
+
+        for step in range(3):
+            command(conn, C_SC_NA_1, DO_01_IOA, 1)
+            command(conn, C_SE_NC_1, AO_01_IOA, 75 + step)
+            await asyncio.sleep(1)
+            print("AI_01", POINTS.get(AI_01_IOA))
+            command(conn, C_SC_NA_1, DO_01_IOA, 0)
+            await asyncio.sleep(1)
+    finally:
+        conn.close()
+        await conn.wait_closed()
+        print("IEC104 link stats", conn.stats)
 
 
 if __name__ == "__main__":
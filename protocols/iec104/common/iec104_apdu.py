@@ -0,0 +1,560 @@
+import asyncio
+import struct
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+START = 0x68
+MAX_APDU_LENGTH = 253  # largest value of the APCI length octet
+MAX_ASDU_LENGTH = MAX_APDU_LENGTH - 4
+SEQ_MODULO = 1 << 15
+
+FRAME_I = "I"
+FRAME_S = "S"
+FRAME_U = "U"
+
+# U-frame functions (first control octet)
+STARTDT_ACT = 0x07
+STARTDT_CON = 0x0B
+STOPDT_ACT = 0x13
+STOPDT_CON = 0x23
+TESTFR_ACT = 0x43
+TESTFR_CON = 0x83
+
+# Type identifiers used by the bench
+M_SP_NA_1 = 1
+M_ME_NC_1 = 13
+C_SC_NA_1 = 45
+C_SE_NC_1 = 50
+C_IC_NA_1 = 100
+
+# Causes of transmission
+COT_PERIODIC = 1
+COT_SPONTANEOUS = 3
+COT_REQUEST = 5
+COT_ACTIVATION = 6
+COT_ACTIVATION_CON = 7
+COT_DEACTIVATION = 8
+COT_ACTIVATION_TERM = 10
+COT_INTERROGATED = 20
+COT_UNKNOWN_TYPE = 44
+COT_UNKNOWN_CAUSE = 45
+COT_UNKNOWN_COMMON_ADDRESS = 46
+COT_UNKNOWN_IOA = 47
+
+QOI_STATION = 20
+SELECT_BIT = 0x80
+
+DEFAULT_K = 12
+DEFAULT_W = 8
+DEFAULT_T1 = 15.0
+DEFAULT_T2 = 10.0
+DEFAULT_T3 = 20.0
+
+ASDU_HEADER = struct.Struct("<BBBBH")
+APCI_HEADER = struct.Struct("<BBHH")
+IOA_LENGTH = 3
+
+# type id -> one information element without its IOA
+ELEMENT_FORMATS: Dict[int, struct.Struct] = {
+    M_SP_NA_1: struct.Struct("<B"),
+    M_ME_NC_1: struct.Struct("<fB"),
+    C_SC_NA_1: struct.Struct("<B"),
+    C_SE_NC_1: struct.Struct("<fB"),
+    C_IC_NA_1: struct.Struct("<B"),
+}
+BIT_TYPES = (M_SP_NA_1, C_SC_NA_1)
+FLOAT_TYPES = (M_ME_NC_1, C_SE_NC_1)
+
+
+class InfoObject(NamedTuple):
+    ioa: int
+    value: float
+    qualifier: int = 0
+
+
+class Asdu(NamedTuple):
+    type_id: int
+    cot: int
+    common_address: int
+    objects: List[InfoObject]
+    negative: bool = False
+    test: bool = False
+    originator: int = 0
+    sequence: bool = False
+    # The received bytes of an ASDU whose type has no element format, so it can
+    # still be mirrored back with a negative cause.
+    raw: bytes = b""
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def encode_element(type_id: int, obj: InfoObject) -> bytes:
+    fmt = ELEMENT_FORMATS[type_id]
+    if type_id in BIT_TYPES:
+        return fmt.pack((int(obj.value) & 0x01) | (obj.qualifier & 0xFE))
+    if type_id in FLOAT_TYPES:
+        return fmt.pack(float(obj.value), obj.qualifier)
+    return fmt.pack(int(obj.value))
+
+
+def decode_element(type_id: int, data, offset: int) -> Tuple[float, int]:
+    fields = ELEMENT_FORMATS[type_id].unpack_from(data, offset)
+    if type_id in BIT_TYPES:
+        return fields[0] & 0x01, fields[0] & 0xFE
+    if type_id in FLOAT_TYPES:
+        return fields[0], fields[1]
+    return fields[0], 0
+
+
+def encode_asdu(asdu: Asdu) -> bytes:
+    if asdu.type_id not in ELEMENT_FORMATS:
+        if not asdu.raw:
+            raise ProtocolError(f"unsupported type id {asdu.type_id}")
+        cot = asdu.cot | (0x40 if asdu.negative else 0) | (0x80 if asdu.test else 0)
+        return asdu.raw[:2] + bytes([cot]) + asdu.raw[3:]
+    if not 0 < len(asdu.objects) <= 0x7F:
+        raise ProtocolError("ASDU must carry 1..127 information objects")
+    vsq = len(asdu.objects) | (0x80 if asdu.sequence else 0)
+    cot = asdu.cot | (0x40 if asdu.negative else 0) | (0x80 if asdu.test else 0)
+    parts = [ASDU_HEADER.pack(asdu.type_id, vsq, cot, asdu.originator, asdu.common_address)]
+    for idx, obj in enumerate(asdu.objects):
+        if not asdu.sequence or idx == 0:
+            parts.append(obj.ioa.to_bytes(IOA_LENGTH, "little"))
+        parts.append(encode_element(asdu.type_id, obj))
+    data = b"".join(parts)
+    if len(data) > MAX_ASDU_LENGTH:
+        raise ProtocolError(f"ASDU of {len(data)} bytes exceeds {MAX_ASDU_LENGTH}")
+    return data
+
+
+def decode_asdu(data) -> Asdu:
+    if len(data) < ASDU_HEADER.size:
+        raise ProtocolError(f"ASDU of {len(data)} bytes is shorter than its header")
+    type_id, vsq, cot, originator, common_address = ASDU_HEADER.unpack_from(data, 0)
+    fmt = ELEMENT_FORMATS.get(type_id)
+    count = vsq & 0x7F
+    sequence = bool(vsq & 0x80)
+    objects: List[InfoObject] = []
+    raw = b""
+    if fmt is None:
+        raw = bytes(data)
+    else:
+        addresses = min(count, 1) if sequence else count
+        expected = ASDU_HEADER.size + addresses * IOA_LENGTH + count * fmt.size
+        if len(data) != expected:
+            raise ProtocolError(f"type {type_id} ASDU with {count} objects is {len(data)} bytes, expected {expected}")
+        offset = ASDU_HEADER.size
+        ioa = 0
+        for idx in range(count):
+            if not sequence or idx == 0:
+                ioa = int.from_bytes(data[offset : offset + IOA_LENGTH], "little")
+                offset += IOA_LENGTH
+            else:
+                ioa += 1
+            value, qualifier = decode_element(type_id, data, offset)
+            offset += fmt.size
+            objects.append(InfoObject(ioa, value, qualifier))
+    return Asdu(
+        type_id=type_id,
+        cot=cot & 0x3F,
+        common_address=common_address,
+        objects=objects,
+        negative=bool(cot & 0x40),
+        test=bool(cot & 0x80),
+        originator=originator,
+        sequence=sequence,
+        raw=raw,
+    )
+
+
+def pack_objects(type_id: int, cot: int, common_address: int, objects: Sequence[InfoObject]) -> Iterator[bytes]:
+    """Pack objects (sorted by IOA) into as few ASDUs as possible.
+
+    A run of consecutive IOAs long enough to fill an SQ=0 ASDU is sent as SQ=1
+    sequences, which carry the IOA once; everything else shares SQ=0 ASDUs.
+    """
+    element = ELEMENT_FORMATS[type_id].size
+    seq_capacity = min(0x7F, (MAX_ASDU_LENGTH - ASDU_HEADER.size - IOA_LENGTH) // element)
+    list_capacity = min(0x7F, (MAX_ASDU_LENGTH - ASDU_HEADER.size) // (IOA_LENGTH + element))
+    scattered: List[InfoObject] = []
+    start = 0
+    total = len(objects)
+    while start < total:
+        end = start + 1
+        while end < total and objects[end].ioa == objects[end - 1].ioa + 1:
+            end += 1
+        while end - start >= list_capacity:
+            chunk = min(seq_capacity, end - start)
+            yield encode_asdu(Asdu(type_id, cot, common_address, list(objects[start : start + chunk]), sequence=True))
+            start += chunk
+        scattered.extend(objects[start:end])
+        while len(scattered) >= list_capacity:
+            yield encode_asdu(Asdu(type_id, cot, common_address, scattered[:list_capacity]))
+            del scattered[:list_capacity]
+        start = end
+    if scattered:
+        yield encode_asdu(Asdu(type_id, cot, common_address, scattered))
+
+
+def i_frame(send_seq: int, recv_seq: int, asdu: bytes) -> bytes:
+    return APCI_HEADER.pack(START, len(asdu) + 4, send_seq << 1, recv_seq << 1) + asdu
+
+
+def s_frame(recv_seq: int) -> bytes:
+    return APCI_HEADER.pack(START, 4, 0x01, recv_seq << 1)
+
+
+def u_frame(function: int) -> bytes:
+    return APCI_HEADER.pack(START, 4, function, 0)
+
+
+def parse_apci(frame) -> Tuple[str, int, int]:
+    """Return (kind, a, b): I -> (N(S), N(R)), S -> (0, N(R)), U -> (function, 0)."""
+    _, _, ctrl_a, ctrl_b = APCI_HEADER.unpack_from(frame, 0)
+    if not ctrl_a & 0x01:
+        return FRAME_I, ctrl_a >> 1, ctrl_b >> 1
+    if ctrl_a & 0x03 == 0x01:
+        return FRAME_S, 0, ctrl_b >> 1
+    return FRAME_U, ctrl_a & 0xFF, 0
+
+
+RECEIVE_BUFFER_SIZE = 64 * 1024
+
+
+class ApduParser:
+    """Reassembles APDUs from a TCP byte stream inside one preallocated buffer.
+
+    Bytes are received straight into the buffer (get_buffer/buffer_updated) and
+    complete frames come back as memoryview slices of it, so nothing is copied or
+    allocated per frame. A frame view is only valid until the next get_buffer().
+    """
+
+    def __init__(self, size: int = RECEIVE_BUFFER_SIZE) -> None:
+        if size < 2 * (MAX_APDU_LENGTH + 2):
+            raise ValueError("receive buffer must hold at least two maximum frames")
+        self._buffer = bytearray(size)
+        self._view = memoryview(self._buffer)
+        self._head = 0  # first byte not yet parsed
+        self._tail = 0  # end of received bytes
+        self._need = 2  # tail at which the next frame (or its header) is complete
+
+    def _make_room(self) -> None:
+        # A partial frame is at most 254 bytes, so moving it to the front is
+        # cheap and leaves room for at least one more full frame.
+        if len(self._buffer) - self._tail < MAX_APDU_LENGTH + 2:
+            head = self._head
+            pending = self._tail - head
+            self._view[:pending] = self._view[head : self._tail]
+            self._head, self._tail, self._need = 0, pending, self._need - head
+
+    def get_buffer(self, sizehint: int = -1) -> memoryview:
+        self._make_room()
+        return self._view[self._tail :]
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self._tail += nbytes
+
+    def feed(self, data) -> Iterator[memoryview]:
+        """Copy data in and yield the frames it completes, for callers that
+        receive into their own bytes objects."""
+        buffer = self._buffer
+        total = len(data)
+        start = 0
+        while start < total:
+            self._make_room()
+            tail = self._tail
+            count = min(len(buffer) - tail, total - start)
+            buffer[tail : tail + count] = data if count == total else data[start : start + count]
+            self._tail = tail + count
+            start += count
+            # Most small segments only extend a partial frame: skip the scan.
+            if self._tail >= self._need:
+                yield from self.frames()
+
+    def frames(self) -> Iterator[memoryview]:
+        buffer = self._buffer
+        head = self._head
+        tail = self._tail
+        while tail - head >= 2:
+            length = buffer[head + 1]
+            if buffer[head] != START or length < 4:
+                raise ProtocolError(f"bad APCI header {bytes(buffer[head : head + 2]).hex()}")
+            end = head + 2 + length
+            if end > tail:
+                self._need = end
+                return
+            self._head = end
+            yield self._view[head:end]
+            head = end
+        if head == tail:
+            self._head = self._tail = 0
+            self._need = 2
+        else:
+            self._need = head + 2
+
+
+class Connection(asyncio.BufferedProtocol):
+    """APCI layer of one TCP link: sequence numbers, k/w windows and t1/t2/t3 timers.
+
+    Both stations use it as the protocol for create_server/create_connection.
+    ASDUs handed to send_asdu() wait in an outbox until data transfer is started
+    and the k window has room; received ASDUs go to on_asdu. Subclasses can build
+    ASDUs only when there is room to send them by overriding refill().
+    """
+
+    def __init__(
+        self,
+        on_asdu: Callable[["Connection", Asdu], None],
+        k: int = DEFAULT_K,
+        w: int = DEFAULT_W,
+        t1: float = DEFAULT_T1,
+        t2: float = DEFAULT_T2,
+        t3: float = DEFAULT_T3,
+    ) -> None:
+        self.on_asdu = on_asdu
+        self.k = k
+        self.w = w
+        self.t1 = t1
+        self.t2 = t2
+        self.t3 = t3
+        self.transport: Optional[asyncio.Transport] = None
+        self.peer = None
+        self.error: Optional[Exception] = None
+
+        self.started = False
+        self.stopping = False  # STOPDT act received, con waits for our I-frames to be acked
+        self.closed = False
+        self.send_seq = 0  # V(S)
+        self.recv_seq = 0  # V(R)
+        self.ack_seq = 0  # oldest of our I-frames not yet acknowledged
+        self.sent_at: Deque[float] = deque()
+        self.unacked_received = 0
+        self.first_unacked_at: Optional[float] = None
+        self.last_received = time.monotonic()
+        self.test_sent_at: Optional[float] = None
+        self.outbox: Deque[bytes] = deque()
+        self.parser = ApduParser()
+        self.stats: Dict[str, int] = {
+            "i_sent": 0,
+            "i_received": 0,
+            "s_sent": 0,
+            "s_received": 0,
+            "u_sent": 0,
+            "u_received": 0,
+            "window_stalls": 0,
+            "bytes_sent": 0,
+            "bytes_received": 0,
+        }
+        self._wake = asyncio.Event()
+        self._started = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writable.set()
+        self._closed = asyncio.get_running_loop().create_future()
+        self._sender: Optional[asyncio.Task] = None
+
+    # asyncio protocol callbacks
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport
+        self.peer = transport.get_extra_info("peername")
+        self.last_received = time.monotonic()
+        self._sender = asyncio.ensure_future(self._send_loop())
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        return self.parser.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self.parser.buffer_updated(nbytes)
+        try:
+            for frame in self.parser.frames():
+                self._handle_frame(frame)
+        except Exception as exc:
+            # Protocol errors and on_asdu failures alike: close the link, keep the error.
+            self._fail(exc)
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.closed = True
+        self.started = False
+        self._wake.set()
+        self._writable.set()
+        if self._sender is not None:
+            self._sender.cancel()
+        if not self._closed.done():
+            self._closed.set_result(None)
+
+    def pause_writing(self) -> None:
+        self._writable.clear()
+
+    def resume_writing(self) -> None:
+        self._writable.set()
+
+    @property
+    def outstanding(self) -> int:
+        return (self.send_seq - self.ack_seq) % SEQ_MODULO
+
+    def send_asdu(self, asdu: bytes) -> None:
+        self.outbox.append(asdu)
+        self._wake.set()
+
+    def refill(self) -> bool:
+        """Called by the sender when the outbox is empty; queue more ASDUs and
+        return True if there were any."""
+        return False
+
+    def wake(self) -> None:
+        """Have the sender call refill() again."""
+        self._wake.set()
+
+    async def start_data_transfer(self) -> None:
+        """Controlling station: send STARTDT act and wait for the confirmation."""
+        self._send_u(STARTDT_ACT)
+        await asyncio.wait_for(self._started.wait(), timeout=self.t1)
+
+    def close(self) -> None:
+        if self.transport is not None and not self.closed:
+            self.closed = True
+            self.started = False
+            self.transport.close()
+
+    async def wait_closed(self) -> None:
+        """Wait for the link to go down; re-raises the protocol error that closed it."""
+        await asyncio.shield(self._closed)
+        if self.error is not None:
+            raise self.error
+
+    def _fail(self, exc: Exception) -> None:
+        if self.error is None:
+            self.error = exc
+        if self.transport is not None:
+            self.transport.abort()
+
+    def _write(self, frame: bytes) -> None:
+        self.transport.write(frame)
+        self.stats["bytes_sent"] += len(frame)
+
+    def _send_u(self, function: int) -> None:
+        self._write(u_frame(function))
+        self.stats["u_sent"] += 1
+
+    def _send_s(self) -> None:
+        self._write(s_frame(self.recv_seq))
+        self.stats["s_sent"] += 1
+        self.unacked_received = 0
+        self.first_unacked_at = None
+
+    def _acknowledge(self, recv_seq: int) -> None:
+        acked = (recv_seq - self.ack_seq) % SEQ_MODULO
+        if acked > self.outstanding:
+            raise ProtocolError(f"N(R)={recv_seq} acknowledges unsent frames")
+        for _ in range(acked):
+            self.sent_at.popleft()
+        self.ack_seq = recv_seq
+        if acked:
+            self._wake.set()
+            if self.stopping and not self.outstanding:
+                self.stopping = False
+                self._send_u(STOPDT_CON)
+
+    def _handle_frame(self, frame) -> None:
+        self.last_received = time.monotonic()
+        self.stats["bytes_received"] += len(frame)
+        kind, a, b = parse_apci(frame)
+        if kind == FRAME_I:
+            self.stats["i_received"] += 1
+            if a != self.recv_seq:
+                raise ProtocolError(f"N(S)={a} but expected {self.recv_seq}")
+            self.recv_seq = (self.recv_seq + 1) % SEQ_MODULO
+            self._acknowledge(b)
+            self.unacked_received += 1
+            if self.first_unacked_at is None:
+                self.first_unacked_at = self.last_received
+                self._wake.set()
+            self.on_asdu(self, decode_asdu(frame[6:]))
+            if self.unacked_received >= self.w:
+                self._send_s()
+        elif kind == FRAME_S:
+            self.stats["s_received"] += 1
+            self._acknowledge(b)
+        else:
+            self.stats["u_received"] += 1
+            if a == STARTDT_ACT:
+                self.started = True
+                self.stopping = False
+                self._send_u(STARTDT_CON)
+                self._wake.set()
+            elif a == STOPDT_ACT:
+                # No new I-frames; confirm once the peer has acked those already sent
+                # (t1 closes the link if it never does).
+                self.started = False
+                if self.unacked_received:
+                    self._send_s()
+                if self.outstanding:
+                    self.stopping = True
+                else:
+                    self._send_u(STOPDT_CON)
+            elif a == TESTFR_ACT:
+                self._send_u(TESTFR_CON)
+            elif a == STARTDT_CON:
+                self.started = True
+                self._started.set()
+                self._wake.set()
+            elif a == STOPDT_CON:
+                self.started = False
+            elif a == TESTFR_CON:
+                self.test_sent_at = None
+
+    async def _send_loop(self) -> None:
+        try:
+            await self._send_forever()
+        except ProtocolError as exc:
+            self._fail(exc)
+
+    async def _send_forever(self) -> None:
+        while not self.closed:
+            stalled = False
+            while self.started and (self.outbox or self.refill()):
+                if self.outstanding >= self.k:
+                    stalled = True
+                    break
+                asdu = self.outbox.popleft()
+                self._write(i_frame(self.send_seq, self.recv_seq, asdu))
+                self.send_seq = (self.send_seq + 1) % SEQ_MODULO
+                self.sent_at.append(time.monotonic())
+                self.stats["i_sent"] += 1
+                # An I-frame carries N(R), so it acknowledges everything received.
+                self.unacked_received = 0
+                self.first_unacked_at = None
+            if stalled:
+                self.stats["window_stalls"] += 1
+            await self._writable.wait()
+
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self._check_timers())
+            except asyncio.TimeoutError:
+                pass
+
+    def _check_timers(self) -> float:
+        """Enforce t1/t2/t3 and return seconds until the next deadline."""
+        now = time.monotonic()
+        if self.sent_at and now - self.sent_at[0] >= self.t1:
+            raise ProtocolError("t1 expired waiting for acknowledgement")
+        if self.test_sent_at is not None and now - self.test_sent_at >= self.t1:
+            raise ProtocolError("t1 expired waiting for TESTFR con")
+        if self.first_unacked_at is not None and now - self.first_unacked_at >= self.t2:
+            self._send_s()
+        if self.test_sent_at is None and now - self.last_received >= self.t3:
+            self._send_u(TESTFR_ACT)
+            self.test_sent_at = now
+
+        deadlines = [self.last_received + self.t3]
+        if self.sent_at:
+            deadlines.append(self.sent_at[0] + self.t1)
+        if self.test_sent_at is not None:
+            deadlines.append(self.test_sent_at + self.t1)
+        if self.first_unacked_at is not None:
+            deadlines.append(self.first_unacked_at + self.t2)
+        return max(min(deadlines) - now, 0.01)
@@ -1,34 +1,57 @@
-import threading
+import asyncio
+import os
 import time
-from typing import Any, Dict, List
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, List, Optional, Tuple
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 
-
-app = FastAPI()
-
-THRESHOLD = 70
-MAX_INT = 32767
+from iec104_apdu import (
+    C_IC_NA_1,
+    C_SC_NA_1,
+    C_SE_NC_1,
+    COT_ACTIVATION,
+    COT_ACTIVATION_CON,
+    COT_ACTIVATION_TERM,
+    M_ME_NC_1,
+    M_SP_NA_1,
+    QOI_STATION,
+    Asdu,
+    Connection,
+    InfoObject,
+    encode_asdu,
+)
+
+IEC104_HOST = os.environ.get("IEC104_HOST", "proto-server-iec104")
+IEC104_PORT = int(os.environ.get("IEC104_PORT", "2404"))
+COMMON_ADDRESS = int(os.environ.get("IEC104_COMMON_ADDRESS", "1"))
+COMMAND_TIMEOUT = float(os.environ.get("IEC104_COMMAND_TIMEOUT", "2.0"))
+RECONNECT_DELAY = float(os.environ.get("IEC104_RECONNECT_DELAY", "2.0"))
 
 DO_IDS = [f"i_do_{i:02d}" for i in range(1, 9)]
 DI_IDS = [f"i_di_{i:02d}" for i in range(1, 9)]
 AO_IDS = [f"i_ao_{i:02d}" for i in range(1, 5)]
 AI_IDS = [f"i_ai_{i:02d}" for i in range(1, 5)]
 
-WRITABLE_PREFIXES = ("i_do_", "i_ao_")
+# tag id -> IOA, matching the server's seed-derived layout
+BOOL_TAGS: Dict[str, int] = {tag_id: idx for idx, tag_id in enumerate(DO_IDS, start=1)}
+BOOL_TAGS.update({tag_id: 100 + idx for idx, tag_id in enumerate(DI_IDS, start=1)})
+NUMBER_TAGS: Dict[str, int] = {tag_id: 1000 + idx for idx, tag_id in enumerate(AO_IDS, start=1)}
+NUMBER_TAGS.update({tag_id: 1100 + idx for idx, tag_id in enumerate(AI_IDS, start=1)})
+NUMBER_TAGS["i_tmr_01"] = 1201
+NUMBER_TAGS["i_cnt_01"] = 1202
+
+# writable tag id -> (command type, IOA)
+COMMAND_TAGS: Dict[str, Tuple[int, int]] = {tag_id: (C_SC_NA_1, BOOL_TAGS[tag_id]) for tag_id in DO_IDS}
+COMMAND_TAGS.update({tag_id: (C_SE_NC_1, NUMBER_TAGS[tag_id]) for tag_id in AO_IDS})
 
-STATE_LOCK = threading.Lock()
-STATE = {
-    "prev_do": [False] * 8,
-    "prev_ao1": 0,
-    "timer": 0,
-    "switch_count": 0,
-    "thresh_count": 0,
-    "last_tick": time.monotonic(),
-    "do": [0] * 8,
-    "ao": [0] * 4,
-}
+# Point cache kept current by interrogation and spontaneous ASDUs.
+POINTS: Dict[int, float] = {}
+LINK: Dict[str, Any] = {"conn": None, "interrogated": False, "last_update": 0.0}
+# (command type, IOA) -> confirmations awaited, oldest first
+PENDING: Dict[Tuple[int, int], Deque[asyncio.Future]] = {}
 
 
 class TagWrite(BaseModel):
@@ -44,95 +67,127 @@ def clamp_ao(value: Any) -> int:
     return max(0, min(100, int(numeric)))
 
 
-def update_state() -> None:
-    do_vals = STATE["do"]
-    ao_vals = STATE["ao"]
-    prev_do = STATE["prev_do"]
-    prev_ao1 = int(STATE["prev_ao1"])
-    timer = int(STATE["timer"])
-    switch_count = int(STATE["switch_count"])
-    thresh_count = int(STATE["thresh_count"])
-    last_tick = float(STATE["last_tick"])
-
-    ao1 = int(ao_vals[0])
-    reset_requested = bool(do_vals[4]) and not bool(prev_do[4])
-    if reset_requested:
-        timer = 0
-        switch_count = 0
-        thresh_count = 0
-        for idx in range(5):
-            do_vals[idx] = 0
-        prev_ao1 = ao1
-        last_tick = time.monotonic()
-    else:
-        for idx in range(4):
-            if not prev_do[idx] and do_vals[idx]:
-                switch_count = min(switch_count + 1, MAX_INT)
-
-        if prev_ao1 <= THRESHOLD < ao1:
-            thresh_count = min(thresh_count + 1, MAX_INT)
-        prev_ao1 = ao1
-
-        now = time.monotonic()
-        if now - last_tick >= 1.0:
-            ticks = int(now - last_tick)
-            last_tick += ticks
-            if ao1 > THRESHOLD:
-                timer = min(timer + ticks, MAX_INT)
-
-    STATE["prev_do"] = list(do_vals)
-    STATE["prev_ao1"] = prev_ao1
-    STATE["timer"] = timer
-    STATE["switch_count"] = switch_count
-    STATE["thresh_count"] = thresh_count
-    STATE["last_tick"] = last_tick
+def on_asdu(conn: Connection, asdu: Asdu) -> None:
+    if asdu.type_id in (M_SP_NA_1, M_ME_NC_1):
+        for obj in asdu.objects:
+            POINTS[obj.ioa] = obj.value
+        LINK["last_update"] = time.time()
+    elif asdu.type_id == C_IC_NA_1 and asdu.cot == COT_ACTIVATION_TERM:
+        LINK["interrogated"] = True
+    elif asdu.type_id in (C_SC_NA_1, C_SE_NC_1) and asdu.objects:
+        if asdu.cot != COT_ACTIVATION_CON and not asdu.negative:
+            return
+        # The server confirms commands to one IOA in the order they were sent, so each
+        # confirmation belongs to the oldest entry, even one whose POST already timed out.
+        waiters = PENDING.get((asdu.type_id, asdu.objects[0].ioa))
+        if waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(not asdu.negative)
+
+
+def fail_pending() -> None:
+    for waiters in PENDING.values():
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(False)
+
+
+async def master_loop() -> None:
+    """Keep one IEC-104 session to the server, reconnecting when it drops."""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            _, conn = await loop.create_connection(lambda: Connection(on_asdu), IEC104_HOST, IEC104_PORT)
+        except OSError as exc:
+            print(f"IEC-104 connect to {IEC104_HOST}:{IEC104_PORT} failed: {exc}")
+            await asyncio.sleep(RECONNECT_DELAY)
+            continue
+
+        try:
+            await conn.start_data_transfer()
+            LINK["conn"] = conn
+            print(f"IEC-104 link up to {conn.peer}")
+            interrogation = Asdu(C_IC_NA_1, COT_ACTIVATION, COMMON_ADDRESS, [InfoObject(0, QOI_STATION)])
+            conn.send_asdu(encode_asdu(interrogation))
+            await conn.wait_closed()
+        except Exception as exc:
+            print(f"IEC-104 link error: {exc}")
+        finally:
+            conn.close()
+            LINK["conn"] = None
+            LINK["interrogated"] = False
+            fail_pending()
+            print(f"IEC-104 link down stats={conn.stats}")
+        await asyncio.sleep(RECONNECT_DELAY)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    task = asyncio.create_task(master_loop())
+    try:
+        yield
+    finally:
+        task.cancel()
+        if LINK["conn"] is not None:
+            LINK["conn"].close()
 
 
-@app.get("/tags")
-def get_tags() -> List[Dict[str, Any]]:
-    with STATE_LOCK:
-        update_state()
-        do_vals = list(STATE["do"])
-        ao_vals = list(STATE["ao"])
-        timer = int(STATE["timer"])
-        switch_count = int(STATE["switch_count"])
-        thresh_count = int(STATE["thresh_count"])
+app = FastAPI(lifespan=lifespan)
 
+
+def require_link() -> Connection:
+    conn: Optional[Connection] = LINK["conn"]
+    if conn is None or not conn.started or not LINK["interrogated"]:
+        raise HTTPException(status_code=503, detail="IEC-104 link down")
+    return conn
+
+
+@app.get("/tags")
+async def get_tags() -> List[Dict[str, Any]]:
+    require_link()
     results: List[Dict[str, Any]] = []
-    for idx, tag_id in enumerate(DO_IDS):
-        results.append({"id": tag_id, "value": bool(do_vals[idx])})
-    for idx, tag_id in enumerate(DI_IDS):
-        results.append({"id": tag_id, "value": bool(do_vals[idx])})
-    for idx, tag_id in enumerate(AO_IDS):
-        results.append({"id": tag_id, "value": int(ao_vals[idx])})
-
-    results.append({"id": "i_ai_01", "value": int(ao_vals[0])})
-    results.append({"id": "i_ai_02", "value": switch_count})
-    results.append({"id": "i_ai_03", "value": thresh_count})
-    results.append({"id": "i_ai_04", "value": int(ao_vals[3])})
-    results.append({"id": "i_tmr_01", "value": timer})
-    results.append({"id": "i_cnt_01", "value": thresh_count})
+    for tag_id, ioa in BOOL_TAGS.items():
+        results.append({"id": tag_id, "value": bool(POINTS.get(ioa, 0))})
+    for tag_id, ioa in NUMBER_TAGS.items():
+        results.append({"id": tag_id, "value": int(POINTS.get(ioa, 0))})
     return results
 
 
 @app.post("/tags")
-def set_tags(payload: List[TagWrite]) -> Dict[str, Any]:
-    written = 0
-    with STATE_LOCK:
-        for item in payload:
-            tag_id = item.id
-            if not tag_id.startswith(WRITABLE_PREFIXES):
-                continue
-            if tag_id.startswith("i_do_"):
-                idx = int(tag_id.split("_")[2]) - 1
-                if 0 <= idx < 8:
-                    STATE["do"][idx] = 1 if bool(item.value) else 0
-                    written += 1
-            elif tag_id.startswith("i_ao_"):
-                idx = int(tag_id.split("_")[2]) - 1
-                if 0 <= idx < 4:
-                    STATE["ao"][idx] = clamp_ao(item.value)
-                    written += 1
-        update_state()
-
-    return {"status": "ok", "written": written}
+async def set_tags(payload: List[TagWrite]) -> Dict[str, Any]:
+    conn = require_link()
+    loop = asyncio.get_running_loop()
+    waiters: List[Tuple[str, asyncio.Future]] = []
+    for item in payload:
+        command = COMMAND_TAGS.get(item.id)
+        if command is None:
+            continue
+        type_id, ioa = command
+        value = (1 if bool(item.value) else 0) if type_id == C_SC_NA_1 else clamp_ao(item.value)
+        waiter = loop.create_future()
+        PENDING.setdefault(command, deque()).append(waiter)
+        conn.send_asdu(encode_asdu(Asdu(type_id, COT_ACTIVATION, COMMON_ADDRESS, [InfoObject(ioa, value)])))
+        waiters.append((item.id, waiter))
+
+    failed: List[str] = []
+    if waiters:
+        done, _ = await asyncio.wait([waiter for _, waiter in waiters], timeout=COMMAND_TIMEOUT)
+        for tag_id, waiter in waiters:
+            if waiter not in done or not waiter.result():
+                failed.append(tag_id)
+                waiter.cancel()
+
+    return {"status": "error" if failed else "ok", "written": len(waiters) - len(failed), "failed": failed}
+
+
+@app.get("/health")
+async def health() -> Dict[str, Any]:
+    conn: Optional[Connection] = LINK["conn"]
+    return {
+        "status": "ok" if conn is not None and conn.started else "down",
+        "points": len(POINTS),
+        "last_update": LINK["last_update"],
+        "link": conn.stats if conn is not None else None,
+    }
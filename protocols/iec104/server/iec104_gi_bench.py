@@ -0,0 +1,77 @@
+import asyncio
+import os
+import time
+from typing import Dict
+
+import iec104_server as server
+from iec104_apdu import (
+    C_IC_NA_1,
+    COT_ACTIVATION,
+    COT_ACTIVATION_TERM,
+    COT_INTERROGATED,
+    QOI_STATION,
+    Asdu,
+    Connection,
+    InfoObject,
+    encode_asdu,
+)
+
+COUNTS = [int(c) for c in os.environ.get("IEC104_BENCH_COUNTS", "26,1000,10000,50000").split(",")]
+ROUNDS = int(os.environ.get("IEC104_BENCH_ROUNDS", "3"))
+BENCH_POINTS = len(server.SP_IOAS) + len(server.ME_IOAS)
+
+
+async def run_interrogation(port: int) -> Dict[str, float]:
+    done = asyncio.Event()
+    received = {"asdus": 0, "objects": 0}
+
+    def on_asdu(conn: Connection, asdu: Asdu) -> None:
+        if asdu.cot == COT_INTERROGATED:
+            received["asdus"] += 1
+            received["objects"] += len(asdu.objects)
+        elif asdu.type_id == C_IC_NA_1 and asdu.cot == COT_ACTIVATION_TERM:
+            done.set()
+
+    _, conn = await asyncio.get_running_loop().create_connection(
+        lambda: Connection(on_asdu, k=server.K, w=server.W), "127.0.0.1", port
+    )
+    try:
+        await conn.start_data_transfer()
+        request = Asdu(C_IC_NA_1, COT_ACTIVATION, server.COMMON_ADDRESS, [InfoObject(0, QOI_STATION)])
+        start = time.perf_counter()
+        conn.send_asdu(encode_asdu(request))
+        await done.wait()
+        elapsed = time.perf_counter() - start
+    finally:
+        conn.close()
+        await conn.wait_closed()
+    return {
+        "seconds": elapsed,
+        "asdus": received["asdus"],
+        "objects": received["objects"],
+        "bytes": conn.stats["bytes_received"],
+    }
+
+
+async def main() -> None:
+    print(f"IEC-104 GI benchmark (k={server.K}, w={server.W}, rounds={ROUNDS})")
+    print(f"{'points':>8} {'asdus':>7} {'obj/asdu':>9} {'bytes':>9} {'best ms':>9} {'points/s':>10}")
+    for count in COUNTS:
+        bulk = max(count - BENCH_POINTS, 0)
+        server.init_points(bulk // 2, bulk - bulk // 2)
+        listener = await asyncio.get_running_loop().create_server(server.new_session, host="127.0.0.1", port=0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            results = [await run_interrogation(port) for _ in range(ROUNDS)]
+        finally:
+            listener.close()
+            await listener.wait_closed()
+        best = min(results, key=lambda r: r["seconds"])
+        print(
+            f"{best['objects']:>8} {best['asdus']:>7} {best['objects'] / best['asdus']:>9.1f} "
+            f"{best['bytes']:>9} {best['seconds'] * 1000:>9.1f} {best['objects'] / best['seconds']:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+import asyncio
+import os
+import random
+import time
+from typing import Callable, List
+
+from iec104_apdu import (
+    COT_SPONTANEOUS,
+    M_ME_NC_1,
+    M_SP_NA_1,
+    START,
+    ApduParser,
+    InfoObject,
+    i_frame,
+    pack_objects,
+    parse_apci,
+    s_frame,
+)
+
+FRAMES = int(os.environ.get("IEC104_BENCH_FRAMES", "200000"))
+ROUNDS = int(os.environ.get("IEC104_BENCH_ROUNDS", "3"))
+
+
+def build_stream(frame_count: int) -> bytes:
+    """Mix of full GI-style I-frames, single-point I-frames and S-frames."""
+    asdus = list(pack_objects(M_SP_NA_1, COT_SPONTANEOUS, 1, [InfoObject(ioa, ioa & 1) for ioa in range(1, 128)]))
+    asdus += list(pack_objects(M_ME_NC_1, COT_SPONTANEOUS, 1, [InfoObject(ioa, 42.0) for ioa in range(1, 49)]))
+    asdus += list(pack_objects(M_ME_NC_1, COT_SPONTANEOUS, 1, [InfoObject(1101, 75.0)]))
+    frames = []
+    for seq in range(frame_count):
+        if seq % 8 == 7:
+            frames.append(s_frame(seq % 32768))
+        else:
+            frames.append(i_frame(seq % 32768, 0, asdus[seq % len(asdus)]))
+    return b"".join(frames)
+
+
+def segment(stream: bytes, sizes: Callable[[], int]) -> List[bytes]:
+    segments = []
+    offset = 0
+    while offset < len(stream):
+        size = sizes()
+        segments.append(stream[offset : offset + size])
+        offset += size
+    return segments
+
+
+def parse_with_parser(segments: List[bytes]) -> int:
+    parser = ApduParser()
+    count = 0
+    for data in segments:
+        for frame in parser.feed(data):
+            parse_apci(frame)
+            count += 1
+    return count
+
+
+def parse_with_readexactly(segments: List[bytes]) -> int:
+    """The previous approach: two readexactly() calls and a concatenation per frame."""
+
+    async def run() -> int:
+        reader = asyncio.StreamReader(limit=1 << 30)
+        for data in segments:
+            reader.feed_data(data)
+        reader.feed_eof()
+        count = 0
+        while True:
+            try:
+                header = await reader.readexactly(2)
+            except asyncio.IncompleteReadError:
+                return count
+            if header[0] != START:
+                raise ValueError("lost frame sync")
+            parse_apci(header + await reader.readexactly(header[1]))
+            count += 1
+
+    return asyncio.run(run())
+
+
+def main() -> None:
+    stream = build_stream(FRAMES)
+    rng = random.Random(104)
+    cases = {
+        "coalesced 64k": segment(stream, lambda: 65536),
+        "mss 1460": segment(stream, lambda: 1460),
+        "fragmented 1-300": segment(stream, lambda: rng.randint(1, 300)),
+    }
+    print(f"IEC-104 parser benchmark ({FRAMES} frames, {len(stream)} bytes, best of {ROUNDS})")
+    print(f"{'segments':<18} {'method':<12} {'frames/s':>12} {'MB/s':>8}")
+    for name, segments in cases.items():
+        for method, parse in (("readexactly", parse_with_readexactly), ("ApduParser", parse_with_parser)):
+            best = None
+            for _ in range(ROUNDS):
+                start = time.perf_counter()
+                count = parse(segments)
+                elapsed = time.perf_counter() - start
+                if count != FRAMES:
+                    raise SystemExit(f"{method} parsed {count} of {FRAMES} frames")
+                best = elapsed if best is None else min(best, elapsed)
+            print(f"{name:<18} {method:<12} {FRAMES / best:>12.0f} {len(stream) / best / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
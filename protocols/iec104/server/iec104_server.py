@@ -1,28 +1,329 @@
 import asyncio
+import heapq
+import math
+import os
+import random
+import time
+from typing import Dict, List, Optional, Set, Tuple
 
+from iec104_apdu import (
+    C_IC_NA_1,
+    C_SC_NA_1,
+    C_SE_NC_1,
+    COT_ACTIVATION,
+    COT_ACTIVATION_CON,
+    COT_ACTIVATION_TERM,
+    COT_INTERROGATED,
+    COT_SPONTANEOUS,
+    COT_UNKNOWN_CAUSE,
+    COT_UNKNOWN_COMMON_ADDRESS,
+    COT_UNKNOWN_IOA,
+    COT_UNKNOWN_TYPE,
+    DEFAULT_K,
+    DEFAULT_T1,
+    DEFAULT_T2,
+    DEFAULT_T3,
+    DEFAULT_W,
+    M_ME_NC_1,
+    M_SP_NA_1,
+    SELECT_BIT,
+    Asdu,
+    Connection,
+    InfoObject,
+    encode_asdu,
+    pack_objects,
+)
 
-async def handle_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
-    addr = writer.get_extra_info("peername")
-    print(f"IEC-104 client connected: {addr}")
-    try:
-        while True:
-            data = await reader.read(1024)
-            if not data:
-                break
-            # Echo back as a placeholder to keep the session alive.
-            writer.write(data)
-            await writer.drain()
-    finally:
-        writer.close()
-        await writer.wait_closed()
-        print(f"IEC-104 client disconnected: {addr}")
+THRESHOLD = 70
+MAX_INT = 2**31 - 1
+TICK_INTERVAL = 0.2
+
+PORT = int(os.environ.get("IEC104_PORT", "2404"))
+COMMON_ADDRESS = int(os.environ.get("IEC104_COMMON_ADDRESS", "1"))
+K = int(os.environ.get("IEC104_K", str(DEFAULT_K)))
+W = int(os.environ.get("IEC104_W", str(DEFAULT_W)))
+T1 = float(os.environ.get("IEC104_T1", str(DEFAULT_T1)))
+T2 = float(os.environ.get("IEC104_T2", str(DEFAULT_T2)))
+T3 = float(os.environ.get("IEC104_T3", str(DEFAULT_T3)))
+
+# Bulk mode: extra generated points for scale tests, and how many of them
+# change on every tick.
+BULK_SP = int(os.environ.get("IEC104_BULK_SP", "0"))
+BULK_ME = int(os.environ.get("IEC104_BULK_ME", "0"))
+BULK_CHANGES = int(os.environ.get("IEC104_BULK_CHANGES", "0"))
+BULK_SP_BASE = 100001
+BULK_ME_BASE = 200001
+
+# IOA layout follows the seed addresses: sp:1:n -> n, sp:2:n -> 100+n,
+# mv:1:n -> 1000+n, mv:2:n -> 1100+n, mv:3:n -> 1200+n.
+DO_IOAS = list(range(1, 9))
+DI_IOAS = list(range(101, 109))
+AO_IOAS = list(range(1001, 1005))
+AI_IOAS = list(range(1101, 1105))
+TMR_IOA = 1201
+CNT_IOA = 1202
+
+SP_IOAS = DO_IOAS + DI_IOAS
+ME_IOAS = AO_IOAS + AI_IOAS + [TMR_IOA, CNT_IOA]
+
+STATE = {
+    "prev_do": [0] * 8,
+    "prev_ao1": 0,
+    "timer": 0,
+    "switch_count": 0,
+    "thresh_count": 0,
+    "last_tick": time.monotonic(),
+    "do": [0] * 8,
+    "ao": [0] * 4,
+}
+
+SESSIONS: Set[Connection] = set()
+
+# type id -> {ioa: value} in ascending IOA order, and IOAs changed since the
+# last spontaneous flush.
+POINTS: Dict[int, Dict[int, float]] = {M_SP_NA_1: {}, M_ME_NC_1: {}}
+PENDING: Dict[int, Set[int]] = {M_SP_NA_1: set(), M_ME_NC_1: set()}
+
+
+def clamp_ao(value: float) -> int:
+    return max(0, min(100, int(value)))
+
+
+def update_state() -> None:
+    do_vals = STATE["do"]
+    ao_vals = STATE["ao"]
+    prev_do = STATE["prev_do"]
+    prev_ao1 = int(STATE["prev_ao1"])
+    timer = int(STATE["timer"])
+    switch_count = int(STATE["switch_count"])
+    thresh_count = int(STATE["thresh_count"])
+    last_tick = float(STATE["last_tick"])
+
+    ao1 = int(ao_vals[0])
+    reset_requested = bool(do_vals[4]) and not bool(prev_do[4])
+    if reset_requested:
+        timer = 0
+        switch_count = 0
+        thresh_count = 0
+        for idx in range(5):
+            do_vals[idx] = 0
+        prev_ao1 = ao1
+        last_tick = time.monotonic()
+    else:
+        for idx in range(4):
+            if not prev_do[idx] and do_vals[idx]:
+                switch_count = min(switch_count + 1, MAX_INT)
+
+        if prev_ao1 <= THRESHOLD < ao1:
+            thresh_count = min(thresh_count + 1, MAX_INT)
+        prev_ao1 = ao1
+
+        now = time.monotonic()
+        if now - last_tick >= 1.0:
+            ticks = int(now - last_tick)
+            last_tick += ticks
+            if ao1 > THRESHOLD:
+                timer = min(timer + ticks, MAX_INT)
+
+    STATE["prev_do"] = list(do_vals)
+    STATE["prev_ao1"] = prev_ao1
+    STATE["timer"] = timer
+    STATE["switch_count"] = switch_count
+    STATE["thresh_count"] = thresh_count
+    STATE["last_tick"] = last_tick
+
+
+def init_points(bulk_sp: int, bulk_me: int) -> None:
+    POINTS[M_SP_NA_1] = dict.fromkeys(SP_IOAS + list(range(BULK_SP_BASE, BULK_SP_BASE + bulk_sp)), 0)
+    POINTS[M_ME_NC_1] = dict.fromkeys(ME_IOAS + list(range(BULK_ME_BASE, BULK_ME_BASE + bulk_me)), 0.0)
+    for pending in PENDING.values():
+        pending.clear()
+    sync_bench_points()
+
+
+def set_point(type_id: int, ioa: int, value: float) -> None:
+    values = POINTS[type_id]
+    if values[ioa] != value:
+        values[ioa] = value
+        PENDING[type_id].add(ioa)
+
+
+def sync_bench_points() -> None:
+    do_vals = STATE["do"]
+    ao_vals = STATE["ao"]
+    thresh_count = float(STATE["thresh_count"])
+    for idx, ioa in enumerate(DO_IOAS):
+        set_point(M_SP_NA_1, ioa, int(do_vals[idx]))
+    for idx, ioa in enumerate(DI_IOAS):
+        set_point(M_SP_NA_1, ioa, int(do_vals[idx]))
+    for idx, ioa in enumerate(AO_IOAS):
+        set_point(M_ME_NC_1, ioa, float(ao_vals[idx]))
+    set_point(M_ME_NC_1, AI_IOAS[0], float(ao_vals[0]))
+    set_point(M_ME_NC_1, AI_IOAS[1], float(STATE["switch_count"]))
+    set_point(M_ME_NC_1, AI_IOAS[2], thresh_count)
+    set_point(M_ME_NC_1, AI_IOAS[3], float(ao_vals[3]))
+    set_point(M_ME_NC_1, TMR_IOA, float(STATE["timer"]))
+    set_point(M_ME_NC_1, CNT_IOA, thresh_count)
+
+
+def churn_bulk_points(count: int) -> None:
+    sp_values = POINTS[M_SP_NA_1]
+    sp_count = len(sp_values) - len(SP_IOAS)
+    for ioa in random.sample(range(BULK_SP_BASE, BULK_SP_BASE + sp_count), min(count, sp_count)):
+        set_point(M_SP_NA_1, ioa, 1 - sp_values[ioa])
+    me_count = len(POINTS[M_ME_NC_1]) - len(ME_IOAS)
+    for ioa in random.sample(range(BULK_ME_BASE, BULK_ME_BASE + me_count), min(count, me_count)):
+        set_point(M_ME_NC_1, ioa, float(random.randint(0, 100)))
+
+
+def interrogation_asdus() -> List[bytes]:
+    asdus: List[bytes] = []
+    for type_id, values in POINTS.items():
+        objects = [InfoObject(ioa, value) for ioa, value in values.items()]
+        asdus.extend(pack_objects(type_id, COT_INTERROGATED, COMMON_ADDRESS, objects))
+    return asdus
+
+
+def flush_changes() -> None:
+    """Hand the IOAs changed since the last flush to every started session."""
+    sessions = [conn for conn in SESSIONS if conn.started]
+    for type_id, pending in PENDING.items():
+        if not pending:
+            continue
+        for conn in sessions:
+            conn.changes[type_id].update(pending)
+        pending.clear()
+    for conn in sessions:
+        conn.wake()
+
+
+def reply(conn: Connection, request: Asdu, cot: int, negative: bool = False) -> None:
+    conn.send_asdu(encode_asdu(request._replace(cot=cot, negative=negative, test=False)))
+
+
+def execute_command(request: Asdu) -> Tuple[int, bool]:
+    """Apply a C_SC_NA_1/C_SE_NC_1 activation and return the confirmation cause."""
+    obj = request.objects[0]
+    if request.type_id == C_SC_NA_1 and obj.ioa in DO_IOAS:
+        if not obj.qualifier & SELECT_BIT:
+            STATE["do"][DO_IOAS.index(obj.ioa)] = 1 if obj.value else 0
+        return COT_ACTIVATION_CON, False
+    if request.type_id == C_SE_NC_1 and obj.ioa in AO_IOAS:
+        if not math.isfinite(obj.value):
+            return COT_ACTIVATION_CON, True
+        if not obj.qualifier & SELECT_BIT:
+            STATE["ao"][AO_IOAS.index(obj.ioa)] = clamp_ao(obj.value)
+        return COT_ACTIVATION_CON, False
+    return COT_UNKNOWN_IOA, True
+
+
+def handle_asdu(conn: Connection, request: Asdu) -> None:
+    if not request.objects and not request.raw:
+        print(f"IEC-104 ignoring empty type {request.type_id} ASDU from {conn.peer}")
+        return
+    if request.type_id not in (C_SC_NA_1, C_SE_NC_1, C_IC_NA_1):
+        reply(conn, request, COT_UNKNOWN_TYPE, negative=True)
+        return
+    if request.cot != COT_ACTIVATION:
+        reply(conn, request, COT_UNKNOWN_CAUSE, negative=True)
+        return
+    if request.common_address not in (COMMON_ADDRESS, 0xFFFF):
+        reply(conn, request, COT_UNKNOWN_COMMON_ADDRESS, negative=True)
+        return
+
+    if request.type_id == C_IC_NA_1:
+        reply(conn, request, COT_ACTIVATION_CON)
+        for asdu in interrogation_asdus():
+            conn.send_asdu(asdu)
+        reply(conn, request, COT_ACTIVATION_TERM)
+        return
+
+    cot, negative = execute_command(request)
+    reply(conn, request, cot, negative=negative)
+    # A select is only confirmed; ACT_TERM follows the execute.
+    if not negative and not request.objects[0].qualifier & SELECT_BIT:
+        reply(conn, request, COT_ACTIVATION_TERM)
+        update_state()
+        sync_bench_points()
+        flush_changes()
+
+
+async def tick_loop() -> None:
+    while True:
+        update_state()
+        sync_bench_points()
+        if BULK_CHANGES:
+            churn_bulk_points(BULK_CHANGES)
+        flush_changes()
+        await asyncio.sleep(TICK_INTERVAL)
+
+
+class PendingIoas:
+    """Changed IOAs waiting to be sent, each once, taken in ascending order: a set for
+    membership and a heap, so taking a window's worth costs O(m log n), not a sort."""
+
+    def __init__(self) -> None:
+        self.members: Set[int] = set()
+        self.heap: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def update(self, ioas: Set[int]) -> None:
+        for ioa in ioas:
+            if ioa not in self.members:
+                self.members.add(ioa)
+                heapq.heappush(self.heap, ioa)
+
+    def take(self, limit: int) -> List[int]:
+        batch = [heapq.heappop(self.heap) for _ in range(min(limit, len(self.heap)))]
+        self.members.difference_update(batch)
+        return batch
+
+
+class Session(Connection):
+    """Server side of one link. Changed IOAs collect per type and are packed into
+    spontaneous ASDUs only when the k window has room, so a slow master costs at
+    most one pending entry per point, always with its latest value."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.changes: Dict[int, PendingIoas] = {type_id: PendingIoas() for type_id in POINTS}
+
+    def refill(self) -> bool:
+        for type_id, ioas in self.changes.items():
+            if ioas:
+                values = POINTS[type_id]
+                # About one k window of ASDUs at a time keeps the values sent recent.
+                objects = [InfoObject(ioa, values[ioa]) for ioa in ioas.take(self.k * 0x7F)]
+                self.outbox.extend(pack_objects(type_id, COT_SPONTANEOUS, COMMON_ADDRESS, objects))
+                return True
+        return False
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        super().connection_made(transport)
+        SESSIONS.add(self)
+        print(f"IEC-104 client connected: {self.peer}")
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        super().connection_lost(exc)
+        SESSIONS.discard(self)
+        if self.error is not None:
+            print(f"IEC-104 protocol error from {self.peer}: {self.error}")
+        print(f"IEC-104 client disconnected: {self.peer} stats={self.stats}")
+
+
+def new_session() -> Session:
+    return Session(handle_asdu, k=K, w=W, t1=T1, t2=T2, t3=T3)
 
 
 async def main() -> None:
-    server = await asyncio.start_server(handle_client, host="0.0.0.0", port=2404)
-    print("IEC-104 placeholder server listening on 0.0.0.0:2404")
+    init_points(BULK_SP, BULK_ME)
+    server = await asyncio.get_running_loop().create_server(new_session, host="0.0.0.0", port=PORT)
+    point_count = sum(len(values) for values in POINTS.values())
+    print(f"IEC-104 server listening on 0.0.0.0:{PORT} (CA={COMMON_ADDRESS}, k={K}, w={W}, points={point_count})")
     async with server:
-        await server.serve_forever()
+        await asyncio.gather(server.serve_forever(), tick_loop())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,202 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import paho.mqtt.client as mqtt
+
+MQTT_HOST = os.environ.get("MQTT_HOST", "proto-server-mqtt")
+MQTT_PORT = int(os.environ.get("MQTT_PORT", "1883"))
+# Command clients, and total command rates (commands/s across all clients) to step through.
+CLIENTS = int(os.environ.get("MQTT_BENCH_CLIENTS", "10"))
+RATES = [float(r) for r in os.environ.get("MQTT_BENCH_RATES", "10,50,200").split(",")]
+SECONDS = float(os.environ.get("MQTT_BENCH_SECONDS", "10"))
+IDLE_SECONDS = float(os.environ.get("MQTT_BENCH_IDLE_SECONDS", "3"))
+# 0 drives the single lab/ device; N > 0 spreads clients over a plant bridge's
+# <MQTT_TOPIC_ROOT>/dev0001..devN devices (see MQTT_DEVICES in device_bridge.py).
+DEVICES = int(os.environ.get("MQTT_BENCH_DEVICES", "0"))
+MQTT_TOPIC_ROOT = os.environ.get("MQTT_TOPIC_ROOT", "plant")
+# Processes sampled from /proc for CPU; only visible when the bench shares their PID namespace.
+BROKER_PROCESS = os.environ.get("MQTT_BENCH_BROKER_PROCESS", "mosquitto")
+BRIDGE_PROCESS = os.environ.get("MQTT_BENCH_BRIDGE_PROCESS", "device_bridge.py")
+
+# Commands write AO_04, which the bridge mirrors to AI_04 without touching the bench
+# counters; each command carries a value that differs from the previous one on that device.
+COMMAND_POINT = "AO_04"
+ECHO_POINT = "AI_04"
+
+
+def device_prefixes() -> List[str]:
+    if DEVICES > 0:
+        return [f"{MQTT_TOPIC_ROOT}/dev{n:04d}" for n in range(1, DEVICES + 1)]
+    return ["lab"]
+
+
+def find_pids(pattern: str) -> List[int]:
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit() or int(entry) == os.getpid():
+            continue
+        try:
+            with open(f"/proc/{entry}/cmdline", "rb") as handle:
+                cmdline = handle.read().replace(b"\0", b" ").decode(errors="replace")
+        except OSError:
+            continue
+        if pattern in cmdline:
+            pids.append(int(entry))
+    return pids
+
+
+def cpu_seconds(pids: List[int]) -> Optional[float]:
+    if not pids:
+        return None
+    total = 0.0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as handle:
+                fields = handle.read().rsplit(")", 1)[1].split()
+        except OSError:
+            return None
+        total += (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    return total
+
+
+class Observer:
+    """One subscriber on every state topic: counts state messages and matches AI_04 echoes
+    to the command that carried the value."""
+
+    def __init__(self, prefixes: List[str]) -> None:
+        self.lock = threading.Lock()
+        self.pending: Dict[Tuple[str, int], float] = {}
+        self.latencies: List[float] = []
+        self.state_messages = 0
+        self.point_suffix = f"/state/{ECHO_POINT}"
+        self.client = mqtt.Client()
+        self.client.on_connect = self.on_connect
+        self.client.on_message = self.on_message
+        self.filter = f"{MQTT_TOPIC_ROOT}/+/state/#" if DEVICES > 0 else "lab/state/#"
+
+    def on_connect(self, client, userdata, flags, rc):
+        client.subscribe(self.filter)
+
+    def on_message(self, client, userdata, msg):
+        now = time.monotonic()
+        if msg.retain:
+            return  # retained state replayed on subscribe, not caused by this run
+        topic = msg.topic
+        if topic.endswith(self.point_suffix):
+            prefix = topic[: -len(self.point_suffix)]
+            value = int(msg.payload)
+        elif topic.endswith("/state"):
+            prefix = topic[: -len("/state")]
+            value = json.loads(msg.payload)[ECHO_POINT]
+        else:
+            prefix, value = None, None
+        with self.lock:
+            self.state_messages += 1
+            if prefix is not None:
+                sent = self.pending.pop((prefix, value), None)
+                if sent is not None:
+                    self.latencies.append(now - sent)
+
+    def expect(self, prefix: str, value: int, sent: float) -> None:
+        with self.lock:
+            self.pending[(prefix, value)] = sent
+
+    def reset(self) -> None:
+        with self.lock:
+            self.pending.clear()
+            self.latencies = []
+            self.state_messages = 0
+
+    def take(self) -> Tuple[List[float], int, int]:
+        with self.lock:
+            return self.latencies, self.state_messages, len(self.pending)
+
+
+def connect(client: mqtt.Client) -> None:
+    client.connect(MQTT_HOST, MQTT_PORT, 60)
+    client.loop_start()
+
+
+def run_rate(rate: float, senders: List[mqtt.Client], prefixes: List[str], observer: Observer) -> int:
+    """Round-robin commands over the clients on absolute deadlines; returns commands sent."""
+    values = {prefix: 0 for prefix in prefixes}
+    interval = 1.0 / rate
+    sent = 0
+    deadline = time.monotonic()
+    end = deadline + SECONDS
+    while deadline < end:
+        client = senders[sent % len(senders)]
+        prefix = prefixes[sent % len(prefixes)]
+        values[prefix] = values[prefix] % 100 + 1
+        observer.expect(prefix, values[prefix], time.monotonic())
+        client.publish(f"{prefix}/cmd/{COMMAND_POINT}", values[prefix])
+        sent += 1
+        deadline += interval
+        time.sleep(max(deadline - time.monotonic(), 0))
+    return sent
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def main() -> None:
+    prefixes = device_prefixes()
+    observer = Observer(prefixes)
+    connect(observer.client)
+    senders = [mqtt.Client() for _ in range(CLIENTS)]
+    for client in senders:
+        connect(client)
+    broker_pids = find_pids(BROKER_PROCESS)
+    bridge_pids = find_pids(BRIDGE_PROCESS)
+    time.sleep(1.0)
+
+    # State traffic the bridge produces with no commands (points mode ticks, refreshes).
+    observer.reset()
+    time.sleep(IDLE_SECONDS)
+    idle_rate = observer.take()[1] / IDLE_SECONDS
+
+    print(
+        f"MQTT command->state benchmark ({MQTT_HOST}:{MQTT_PORT}, {CLIENTS} clients, "
+        f"{len(prefixes)} device(s), {SECONDS:.0f}s per rate, idle state {idle_rate:.1f} msg/s)"
+    )
+    print(
+        f"{'cmd/s':>7} {'sent':>6} {'echoed':>6} {'p50 ms':>7} {'p90 ms':>7} {'p99 ms':>7} {'max ms':>7} "
+        f"{'state/s':>8} {'ampl':>5} {'broker%':>8} {'bridge%':>8}"
+    )
+    for rate in RATES:
+        observer.reset()
+        broker_start, bridge_start = cpu_seconds(broker_pids), cpu_seconds(bridge_pids)
+        start = time.monotonic()
+        sent = run_rate(rate, senders, prefixes, observer)
+        time.sleep(0.5)  # let the last echoes arrive
+        elapsed = time.monotonic() - start
+        broker_end, bridge_end = cpu_seconds(broker_pids), cpu_seconds(bridge_pids)
+        latencies, state_messages, _ = observer.take()
+        latencies.sort()
+        # State messages per command, net of what the bridge publishes when idle.
+        amplification = (state_messages - idle_rate * elapsed) / sent if sent else 0.0
+        cpu = [
+            f"{(end - begin) / elapsed * 100:>8.1f}" if begin is not None and end is not None else f"{'n/a':>8}"
+            for begin, end in ((broker_start, broker_end), (bridge_start, bridge_end))
+        ]
+        if latencies:
+            dist = (percentile(latencies, 0.5), percentile(latencies, 0.9), percentile(latencies, 0.99), latencies[-1])
+            dist_text = " ".join(f"{value * 1000:>7.1f}" for value in dist)
+        else:
+            dist_text = " ".join(f"{'-':>7}" for _ in range(4))
+        print(
+            f"{rate:>7.0f} {sent:>6} {len(latencies):>6} {dist_text} {state_messages / elapsed:>8.0f} "
+            f"{amplification:>5.1f} {cpu[0]} {cpu[1]}"
+        )
+
+    for client in (observer.client, *senders):
+        client.loop_stop()
+        client.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,12 @@
+import asyncio
+import json
 import os
+import queue
+import socket
+import threading
 import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
 
 import paho.mqtt.client as mqtt
 
@@ -8,113 +15,491 @@ MAX_INT = 2**31 - 1
 
 MQTT_HOST = os.environ.get("MQTT_HOST", "proto-server-mqtt")
 MQTT_PORT = int(os.environ.get("MQTT_PORT", "1883"))
+# "points": every point on <prefix>/state/<NAME> each cycle (original behaviour).
+# "changes": only changed points, retained, on the same per-point topics.
+# "batch": one retained JSON object with all points on <prefix>/state, only when something changed.
+MQTT_STATE_MODE = os.environ.get("MQTT_STATE_MODE", "points")
+# In "changes"/"batch" mode, republish everything at least this often (seconds).
+MQTT_STATE_REFRESH = float(os.environ.get("MQTT_STATE_REFRESH", "10"))
+# 0 runs the single bench device on lab/...; N > 0 runs a plant of N virtual devices on
+# <MQTT_TOPIC_ROOT>/devNNNN/... over one asyncio-driven connection.
+MQTT_DEVICES = int(os.environ.get("MQTT_DEVICES", "0"))
+MQTT_TOPIC_ROOT = os.environ.get("MQTT_TOPIC_ROOT", "plant")
+# QoS per topic class: state updates, and the retained reset commands the bridge publishes.
+MQTT_STATE_QOS = int(os.environ.get("MQTT_STATE_QOS", "0"))
+MQTT_CONTROL_QOS = int(os.environ.get("MQTT_CONTROL_QOS", "1"))
+# Messages handed to paho and not yet written (QoS 0) or acknowledged (QoS 1/2).
+MQTT_MAX_INFLIGHT = int(os.environ.get("MQTT_MAX_INFLIGHT", "100"))
+# Distinct state topics waiting behind the in-flight window; the oldest is dropped beyond this.
+MQTT_MAX_QUEUED = int(os.environ.get("MQTT_MAX_QUEUED", "10000"))
+# Seconds between command->state latency and outbox reports.
+MQTT_LATENCY_REPORT = float(os.environ.get("MQTT_LATENCY_REPORT", "30"))
+TICK_INTERVAL = 0.2
+RECONNECT_DELAY = 2.0
 
-STATE = {
-    "DO": [0] * 8,
-    "DI": [0] * 8,
-    "AO": [0] * 4,
-    "AI": [0] * 4,
-    "TMR_01": 0,
-    "CNT_01": 0,
-}
+POINT_NAMES = (
+    [f"DO_0{i+1}" for i in range(8)]
+    + [f"DI_0{i+1}" for i in range(8)]
+    + [f"AO_0{i+1}" for i in range(4)]
+    + [f"AI_0{i+1}" for i in range(4)]
+    + ["TMR_01", "CNT_01"]
+)
+
+
+class Device:
+    """One simulated bench: its points, engine memory and what was last published for it."""
+
+    def __init__(self, prefix: str) -> None:
+        self.prefix = prefix
+        self.state = {
+            "DO": [0] * 8,
+            "DI": [0] * 8,
+            "AO": [0] * 4,
+            "AI": [0] * 4,
+            "TMR_01": 0,
+            "CNT_01": 0,
+        }
+        self.engine = {
+            "prev_do": [0] * 8,
+            "prev_ao1": 0,
+            "timer": 0,
+            "switch_count": 0,
+            "thresh_count": 0,
+            "last_tick": time.monotonic(),
+        }
+        # Last value published per point and when everything was last republished.
+        self.published: Dict[str, int] = {}
+        self.refreshed_at = 0.0
+        # Topics are built once; publishing only looks them up.
+        self.state_topic = f"{prefix}/state"
+        self.point_topics = {name: f"{prefix}/state/{name}" for name in POINT_NAMES}
+        self.reset_topics = [f"{prefix}/cmd/DO_0{i+1}" for i in range(5)]
+
+
+Route = Tuple[Device, str, int]
+
+
+def build_routes(devices: List[Device]) -> Dict[str, Route]:
+    """Exact command topic -> (device, "DO"/"AO", index); dispatch is a single dict lookup."""
+    routes: Dict[str, Route] = {}
+    for device in devices:
+        for idx in range(8):
+            routes[f"{device.prefix}/cmd/DO_0{idx+1}"] = (device, "DO", idx)
+        for idx in range(4):
+            routes[f"{device.prefix}/cmd/AO_0{idx+1}"] = (device, "AO", idx)
+    return routes
+
+
+class Outbox:
+    """Every publish goes through here. Control messages are sent first and never dropped;
+    state updates wait per topic, so a newer value replaces one that was not sent yet, and
+    the oldest waiting topic is dropped once MQTT_MAX_QUEUED are waiting. At most
+    MQTT_MAX_INFLIGHT messages are handed to paho before it reports them published."""
+
+    def __init__(self, client: mqtt.Client) -> None:
+        self.client = client
+        self.lock = threading.Lock()
+        # Held while publishing, never while waiting on paho: acks arrive under paho's locks.
+        self.sending = threading.Lock()
+        self.control: Deque[Tuple[str, Any, bool]] = deque()
+        self.state: "OrderedDict[str, Tuple[Any, bool]]" = OrderedDict()
+        # mid -> QoS of each message handed to paho and not yet reported published.
+        self.inflight: Dict[int, int] = {}
+        self.publishing = 0  # a slot held while publish() runs, before its mid is known
+        # Acks that arrived before publish() returned their mid.
+        self.early_acks: Set[int] = set()
+        self.stats = {"queued": 0, "coalesced": 0, "dropped": 0, "sent": 0, "acked": 0}
+        self.reported_at = time.monotonic()
+        client.max_inflight_messages_set(MQTT_MAX_INFLIGHT)
+        client.on_publish = self.on_publish
+
+    def put_state(self, topic: str, payload: Any, retain: bool) -> None:
+        with self.lock:
+            self.stats["queued"] += 1
+            if topic in self.state:
+                self.stats["coalesced"] += 1
+            elif len(self.state) >= MQTT_MAX_QUEUED:
+                self.state.popitem(last=False)
+                self.stats["dropped"] += 1
+            self.state[topic] = (payload, retain)
+
+    def put_control(self, topic: str, payload: Any, retain: bool) -> None:
+        with self.lock:
+            self.stats["queued"] += 1
+            self.control.append((topic, payload, retain))
+
+    def window_full(self) -> bool:
+        """Call with self.lock held."""
+        return len(self.inflight) + self.publishing >= MQTT_MAX_INFLIGHT
+
+    def flush(self) -> None:
+        while self.sending.acquire(blocking=False):
+            try:
+                self._send_window()
+            finally:
+                self.sending.release()
+            # An ack or a put that found the sender busy left its slot or message to it;
+            # look again now that the lock is free.
+            with self.lock:
+                if self.window_full() or not (self.control or self.state):
+                    return
+        # Otherwise the current sender checks again after it releases the lock.
+
+    def _send_window(self) -> None:
+        while True:
+            with self.lock:
+                if self.window_full():
+                    return
+                if self.control:
+                    topic, payload, retain = self.control.popleft()
+                    qos = MQTT_CONTROL_QOS
+                elif self.state:
+                    topic, (payload, retain) = self.state.popitem(last=False)
+                    qos = MQTT_STATE_QOS
+                else:
+                    return
+                self.publishing += 1
+            info = self.client.publish(topic, payload, qos=qos, retain=retain)
+            with self.lock:
+                self.publishing -= 1
+                # paho keeps QoS 1/2 messages across a reconnect; anything else is gone.
+                if info.rc == mqtt.MQTT_ERR_SUCCESS or (qos and info.rc == mqtt.MQTT_ERR_NO_CONN):
+                    self.stats["sent"] += 1
+                    if info.mid in self.early_acks:
+                        self.early_acks.discard(info.mid)
+                    else:
+                        self.inflight[info.mid] = qos
+                else:
+                    self.stats["dropped"] += 1
+
+    def on_publish(self, client, userdata, mid) -> None:
+        with self.lock:
+            if self.inflight.pop(mid, None) is None:
+                self.early_acks.add(mid)
+            self.stats["acked"] += 1
+        self.flush()
+
+    def on_connect(self) -> None:
+        # paho resends QoS 1/2 messages from the old session and reports them as usual;
+        # unwritten QoS 0 packets are discarded on reconnect and never will be.
+        with self.lock:
+            self.inflight = {mid: qos for mid, qos in self.inflight.items() if qos}
+
+    def report(self) -> None:
+        now = time.monotonic()
+        if now - self.reported_at < MQTT_LATENCY_REPORT:
+            return
+        with self.lock:
+            stats = dict(self.stats, inflight=len(self.inflight), waiting=len(self.control) + len(self.state))
+        self.reported_at = now
+        print("outbox " + " ".join(f"{name}={value}" for name, value in stats.items()))
+
+
+# Filled in by main() before the connection is opened.
+OUTBOX: Optional[Outbox] = None
+ROUTES: Dict[str, Route] = {}
+SUBSCRIPTION = "lab/cmd/#"
+
+# In single-device mode on_message runs on paho's network thread. It only parses the
+# command and enqueues it; the main loop is the single writer of device state.
+COMMAND_QUEUE: "queue.SimpleQueue[Tuple[Device, str, int, int, float]]" = queue.SimpleQueue()
+LATENCY = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "reported_at": time.monotonic()}
 
 
 def on_connect(client, userdata, flags, rc):
-    client.subscribe("lab/cmd/#")
+    # A command usually produces several small publishes; do not let Nagle hold them back.
+    client.socket().setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    OUTBOX.on_connect()
+    client.subscribe(SUBSCRIPTION)
+    OUTBOX.flush()
 
 
-def on_message(client, userdata, msg):
-    topic = msg.topic
-    payload = msg.payload.decode("utf-8").strip()
+def parse_command(msg) -> Tuple[Optional[Route], int]:
+    route = ROUTES.get(msg.topic)
+    if route is None:
+        return None, 0
     try:
-        value = int(float(payload))
+        value = int(float(msg.payload.decode("utf-8").strip()))
     except ValueError:
         value = 0
+    return route, value
+
+
+def on_message(client, userdata, msg):
+    route, value = parse_command(msg)
+    if route is not None:
+        COMMAND_QUEUE.put((*route, value, time.monotonic()))
+
 
-    if topic.startswith("lab/cmd/DO_"):
-        idx = int(topic.split("DO_")[1]) - 1
-        if 0 <= idx < 8:
-            STATE["DO"][idx] = 1 if value else 0
-    elif topic.startswith("lab/cmd/AO_"):
-        idx = int(topic.split("AO_")[1]) - 1
-        if 0 <= idx < 4:
-            STATE["AO"][idx] = max(0, min(100, value))
+def apply_command(device: Device, key: str, idx: int, value: int) -> None:
+    if key == "DO":
+        device.state["DO"][idx] = 1 if value else 0
+    else:
+        device.state["AO"][idx] = max(0, min(100, value))
 
 
-def publish_state(client):
+def drain_commands(timeout: float) -> List[float]:
+    """Apply queued commands, waiting up to timeout for the first one; returns their receive times."""
+    received: List[float] = []
+    try:
+        device, key, idx, value, at = COMMAND_QUEUE.get(timeout=max(timeout, 0.0))
+    except queue.Empty:
+        return received
+    while True:
+        apply_command(device, key, idx, value)
+        received.append(at)
+        try:
+            device, key, idx, value, at = COMMAND_QUEUE.get_nowait()
+        except queue.Empty:
+            return received
+
+
+def record_latency(received: List[float]) -> None:
+    now = time.monotonic()
+    for at in received:
+        latency_ms = (now - at) * 1000
+        LATENCY["count"] += 1
+        LATENCY["total_ms"] += latency_ms
+        LATENCY["max_ms"] = max(LATENCY["max_ms"], latency_ms)
+    if now - LATENCY["reported_at"] >= MQTT_LATENCY_REPORT and LATENCY["count"]:
+        print(
+            f"command->state latency n={LATENCY['count']} "
+            f"mean={LATENCY['total_ms'] / LATENCY['count']:.2f}ms max={LATENCY['max_ms']:.2f}ms"
+        )
+        LATENCY.update(count=0, total_ms=0.0, max_ms=0.0, reported_at=now)
+
+
+def state_points(device: Device) -> Dict[str, int]:
+    state = device.state
+    points = {}
     for i in range(8):
-        client.publish(f"lab/state/DO_0{i+1}", STATE["DO"][i], retain=False)
-        client.publish(f"lab/state/DI_0{i+1}", STATE["DI"][i], retain=False)
+        points[f"DO_0{i+1}"] = state["DO"][i]
+        points[f"DI_0{i+1}"] = state["DI"][i]
     for i in range(4):
-        client.publish(f"lab/state/AO_0{i+1}", STATE["AO"][i], retain=False)
-        client.publish(f"lab/state/AI_0{i+1}", STATE["AI"][i], retain=False)
-    client.publish("lab/state/TMR_01", STATE["TMR_01"], retain=False)
-    client.publish("lab/state/CNT_01", STATE["CNT_01"], retain=False)
+        points[f"AO_0{i+1}"] = state["AO"][i]
+        points[f"AI_0{i+1}"] = state["AI"][i]
+    points["TMR_01"] = state["TMR_01"]
+    points["CNT_01"] = state["CNT_01"]
+    return points
 
 
-def publish_reset_commands(client):
-    for i in range(5):
-        client.publish(f"lab/cmd/DO_0{i+1}", 0, retain=True)
+def publish_state(outbox: Outbox, device: Device) -> None:
+    points = state_points(device)
+    if MQTT_STATE_MODE == "points":
+        for name, value in points.items():
+            outbox.put_state(device.point_topics[name], value, retain=False)
+        return
 
+    now = time.monotonic()
+    refresh = now - device.refreshed_at >= MQTT_STATE_REFRESH
+    published = device.published
+    changed = {name: value for name, value in points.items() if refresh or published.get(name) != value}
+    if not changed:
+        return
+    if MQTT_STATE_MODE == "batch":
+        outbox.put_state(device.state_topic, json.dumps(points, separators=(",", ":")), retain=True)
+    else:
+        for name, value in changed.items():
+            outbox.put_state(device.point_topics[name], value, retain=True)
+    published.update(points)
+    if refresh:
+        device.refreshed_at = now
 
-def main() -> None:
+
+def publish_reset_commands(outbox: Outbox, device: Device) -> None:
+    """Clear the retained DO_01..05 commands so a reconnecting bridge does not replay them.
+
+    These go out as control messages, ahead of any waiting state updates and at
+    MQTT_CONTROL_QOS, so a slow broker cannot let them land after newer commands."""
+    for topic in device.reset_topics:
+        outbox.put_control(topic, 0, retain=True)
+
+
+def update_state(outbox: Outbox, device: Device) -> None:
+    state = device.state
+    engine = device.engine
+    prev_do = engine["prev_do"]
+    prev_ao1 = engine["prev_ao1"]
+    timer = engine["timer"]
+    switch_count = engine["switch_count"]
+    thresh_count = engine["thresh_count"]
+    last_tick = engine["last_tick"]
+
+    ao1 = int(state["AO"][0])
+    reset_requested = state["DO"][4] and not prev_do[4]
+    if reset_requested:
+        timer = 0
+        switch_count = 0
+        thresh_count = 0
+        prev_ao1 = ao1
+        last_tick = time.monotonic()
+        for idx in range(5):
+            state["DO"][idx] = 0
+        publish_reset_commands(outbox, device)
+    else:
+        for idx in range(4):
+            if not prev_do[idx] and state["DO"][idx]:
+                switch_count = min(switch_count + 1, MAX_INT)
+
+        if prev_ao1 <= THRESHOLD < ao1:
+            thresh_count = min(thresh_count + 1, MAX_INT)
+        prev_ao1 = ao1
+
+        now = time.monotonic()
+        if now - last_tick >= 1.0:
+            ticks = int(now - last_tick)
+            last_tick += ticks
+            if ao1 > THRESHOLD:
+                timer = min(timer + ticks, MAX_INT)
+
+    engine["prev_do"] = list(state["DO"])
+    engine["prev_ao1"] = prev_ao1
+    engine["timer"] = timer
+    engine["switch_count"] = switch_count
+    engine["thresh_count"] = thresh_count
+    engine["last_tick"] = last_tick
+
+    # Mirror DO -> DI
+    state["DI"] = list(state["DO"])
+
+    # Mirror AO -> AI (canonical counters via AI_02/AI_03)
+    state["AI"][0] = ao1
+    state["AI"][1] = switch_count
+    state["AI"][2] = thresh_count
+    state["AI"][3] = int(state["AO"][3])
+
+    state["TMR_01"] = timer
+    state["CNT_01"] = thresh_count
+
+
+class AsyncioMqtt:
+    """Drives a paho client from the asyncio loop through its socket callbacks (no network thread)."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, client: mqtt.Client) -> None:
+        self.loop = loop
+        self.client = client
+        self.misc = None
+        self.disconnected = asyncio.Event()
+        client.on_socket_open = self.on_socket_open
+        client.on_socket_close = self.on_socket_close
+        client.on_socket_register_write = self.on_socket_register_write
+        client.on_socket_unregister_write = self.on_socket_unregister_write
+
+    def on_socket_open(self, client, userdata, sock) -> None:
+        self.disconnected.clear()
+        self.loop.add_reader(sock, client.loop_read)
+        self.misc = self.loop.create_task(self.misc_loop())
+
+    def on_socket_close(self, client, userdata, sock) -> None:
+        self.loop.remove_reader(sock)
+        if self.misc is not None:
+            self.misc.cancel()
+        self.disconnected.set()
+
+    def on_socket_register_write(self, client, userdata, sock) -> None:
+        self.loop.add_writer(sock, client.loop_write)
+
+    def on_socket_unregister_write(self, client, userdata, sock) -> None:
+        self.loop.remove_writer(sock)
+
+    async def misc_loop(self) -> None:
+        # Keepalive pings and retries; loop_misc only fails once the connection is gone.
+        while self.client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+            await asyncio.sleep(1)
+
+
+async def run_plant(devices: List[Device]) -> None:
+    """Every device shares one connection and one wildcard subscription; callbacks and ticks
+    all run on the event loop, so device state has a single writer without a queue."""
+    global OUTBOX
     client = mqtt.Client()
+    OUTBOX = Outbox(client)
+
+    def on_plant_message(client, userdata, msg):
+        route, value = parse_command(msg)
+        if route is None:
+            return
+        device, key, idx = route
+        received = time.monotonic()
+        apply_command(device, key, idx, value)
+        update_state(OUTBOX, device)
+        publish_state(OUTBOX, device)
+        OUTBOX.flush()
+        record_latency([received])
+
+    client.on_connect = on_connect
+    client.on_message = on_plant_message
+    connection = AsyncioMqtt(asyncio.get_running_loop(), client)
+
+    # Spread the periodic full refresh so the whole plant does not republish at once.
+    now = time.monotonic()
+    for n, device in enumerate(devices):
+        device.refreshed_at = now - MQTT_STATE_REFRESH * (1 - n / len(devices))
+
+    async def tick_loop() -> None:
+        next_tick = time.monotonic()
+        while True:
+            if client.is_connected():
+                for device in devices:
+                    update_state(OUTBOX, device)
+                    publish_state(OUTBOX, device)
+                OUTBOX.flush()
+            OUTBOX.report()
+            next_tick = max(next_tick + TICK_INTERVAL, time.monotonic())
+            await asyncio.sleep(next_tick - time.monotonic())
+
+    ticker = asyncio.get_running_loop().create_task(tick_loop())
+    try:
+        while True:
+            try:
+                client.connect(MQTT_HOST, MQTT_PORT, 60)
+            except OSError as exc:
+                print(f"MQTT connect to {MQTT_HOST}:{MQTT_PORT} failed: {exc}")
+                await asyncio.sleep(RECONNECT_DELAY)
+                continue
+            await connection.disconnected.wait()
+            await asyncio.sleep(RECONNECT_DELAY)
+    finally:
+        ticker.cancel()
+
+
+def run_single(device: Device) -> None:
+    global OUTBOX
+    client = mqtt.Client()
+    OUTBOX = Outbox(client)
     client.on_connect = on_connect
     client.on_message = on_message
     client.connect(MQTT_HOST, MQTT_PORT, 60)
     client.loop_start()
 
-    prev_ao1 = 0
-    prev_do = [0] * 8
-    timer = 0
-    switch_count = 0
-    thresh_count = 0
-    last_tick = time.monotonic()
-
+    next_tick = time.monotonic()
     while True:
-        ao1 = int(STATE["AO"][0])
-        reset_requested = STATE["DO"][4] and not prev_do[4]
-        if reset_requested:
-            timer = 0
-            switch_count = 0
-            thresh_count = 0
-            prev_ao1 = ao1
-            last_tick = time.monotonic()
-            for idx in range(5):
-                STATE["DO"][idx] = 0
-            publish_reset_commands(client)
-        else:
-            for idx in range(4):
-                if not prev_do[idx] and STATE["DO"][idx]:
-                    switch_count = min(switch_count + 1, MAX_INT)
-
-            if prev_ao1 <= THRESHOLD < ao1:
-                thresh_count = min(thresh_count + 1, MAX_INT)
-            prev_ao1 = ao1
-
-            now = time.monotonic()
-            if now - last_tick >= 1.0:
-                ticks = int(now - last_tick)
-                last_tick += ticks
-                if ao1 > THRESHOLD:
-                    timer = min(timer + ticks, MAX_INT)
-
-        prev_do = list(STATE["DO"])
-
-        # Mirror DO -> DI
-        STATE["DI"] = list(STATE["DO"])
-
-        # Mirror AO -> AI (canonical counters via AI_02/AI_03)
-        STATE["AI"][0] = ao1
-        STATE["AI"][1] = switch_count
-        STATE["AI"][2] = thresh_count
-        STATE["AI"][3] = int(STATE["AO"][3])
-
-        STATE["TMR_01"] = timer
-        STATE["CNT_01"] = thresh_count
-
-        publish_state(client)
-        time.sleep(0.2)
+        received = drain_commands(next_tick - time.monotonic())
+        now = time.monotonic()
+        if now >= next_tick:
+            next_tick = max(next_tick + TICK_INTERVAL, now)
+        elif not received:
+            continue
+        update_state(OUTBOX, device)
+        publish_state(OUTBOX, device)
+        OUTBOX.flush()
+        OUTBOX.report()
+        if received:
+            record_latency(received)
+
+
+def main() -> None:
+    global SUBSCRIPTION
+    if MQTT_DEVICES > 0:
+        devices = [Device(f"{MQTT_TOPIC_ROOT}/dev{n:04d}") for n in range(1, MQTT_DEVICES + 1)]
+        ROUTES.update(build_routes(devices))
+        SUBSCRIPTION = f"{MQTT_TOPIC_ROOT}/+/cmd/#"
+        print(f"plant mode: {len(devices)} devices under {MQTT_TOPIC_ROOT}/, {len(ROUTES)} command topics")
+        asyncio.run(run_plant(devices))
+    else:
+        device = Device("lab")
+        ROUTES.update(build_routes([device]))
+        run_single(device)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,63 @@
+"""One Read service call for a whole tag list, one Write call for a batch of setpoints
+(python-opcua), instead of a get_value()/set_value() round trip per node."""
+from typing import Dict, List, Optional
+
+from opcua import Client, ua
+
+# Bench tag list, name -> NodeId, in address-space order.
+LAB_TAGS = {
+    name: f"ns=2;s=opcua/{name}"
+    for name in (
+        [f"DO_0{i}" for i in range(1, 9)]
+        + [f"DI_0{i}" for i in range(1, 9)]
+        + [f"AO_0{i}" for i in range(1, 5)]
+        + [f"AI_0{i}" for i in range(1, 5)]
+        + ["TMR_01", "CNT_01"]
+    )
+}
+
+
+class TagBatch:
+    def __init__(self, client: Client, tags: Dict[str, str]) -> None:
+        self.uaclient = client.uaclient
+        self.nodeids = {name: ua.NodeId.from_string(nodeid) for name, nodeid in tags.items()}
+        self.read_params = self._read_params(list(self.nodeids))
+        # Variant type per tag, learned from reads: servers reject e.g. a Double written to a Float node.
+        self.types: Dict[str, ua.VariantType] = {}
+
+    def _read_params(self, names: List[str]) -> ua.ReadParameters:
+        params = ua.ReadParameters()
+        for name in names:
+            rv = ua.ReadValueId()
+            rv.NodeId = self.nodeids[name]
+            rv.AttributeId = ua.AttributeIds.Value
+            params.NodesToRead.append(rv)
+        return params
+
+    def read(self, names: Optional[List[str]] = None) -> Dict[str, object]:
+        """Values of every tag (or of names) from a single Read request."""
+        if names is None:
+            names, params = list(self.nodeids), self.read_params
+        else:
+            params = self._read_params(names)
+        values = {}
+        for name, dv in zip(names, self.uaclient.read(params)):
+            dv.StatusCode.check()
+            values[name] = dv.Value.Value
+            self.types[name] = dv.Value.VariantType
+        return values
+
+    def write(self, values: Dict[str, object]) -> None:
+        """All values in a single Write request, each as its node's own variant type."""
+        unknown = [name for name in values if name not in self.types]
+        if unknown:
+            self.read(unknown)
+        params = ua.WriteParameters()
+        for name, value in values.items():
+            wv = ua.WriteValue()
+            wv.NodeId = self.nodeids[name]
+            wv.AttributeId = ua.AttributeIds.Value
+            wv.Value = ua.DataValue(ua.Variant(value, self.types[name]))
+            params.NodesToWrite.append(wv)
+        for status in self.uaclient.write(params):
+            status.check()
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional
+
+from asyncua import Client, ua
+
+OPCUA_ENDPOINT = os.environ.get("OPCUA_ENDPOINT", "opc.tcp://proto-server-opcua:4840/")
+SESSIONS = [int(s) for s in os.environ.get("OPCUA_BENCH_SESSIONS", "1,10,100").split(",")]
+SECONDS = float(os.environ.get("OPCUA_BENCH_SECONDS", "10"))
+# Server process sampled from /proc for CPU; only visible when the bench shares its PID namespace.
+SERVER_PROCESS = os.environ.get("OPCUA_BENCH_SERVER_PROCESS", "opcua_server.py")
+
+READ_POINTS = (
+    [f"DO_0{i}" for i in range(1, 9)]
+    + [f"DI_0{i}" for i in range(1, 9)]
+    + [f"AO_0{i}" for i in range(1, 5)]
+    + [f"AI_0{i}" for i in range(1, 5)]
+    + ["TMR_01", "CNT_01"]
+)
+# AO_02/AO_03 feed nothing and AO_04 only mirrors to AI_04, so writes leave the counters alone.
+WRITE_POINTS = ["AO_02", "AO_03", "AO_04"]
+
+
+def find_pids(pattern: str) -> List[int]:
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit() or int(entry) == os.getpid():
+            continue
+        try:
+            with open(f"/proc/{entry}/cmdline", "rb") as handle:
+                cmdline = handle.read().replace(b"\0", b" ").decode(errors="replace")
+        except OSError:
+            continue
+        if pattern in cmdline:
+            pids.append(int(entry))
+    return pids
+
+
+def cpu_seconds(pids: List[int]) -> Optional[float]:
+    if not pids:
+        return None
+    total = 0.0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as handle:
+                fields = handle.read().rsplit(")", 1)[1].split()
+        except OSError:
+            return None
+        total += (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    return total
+
+
+async def session_loop(client: Client, service: str, end: float, latencies: List[float]) -> None:
+    """Back-to-back Read (all bench points) or Write (WRITE_POINTS) calls until end."""
+    if service == "read":
+        nodes = [client.get_node(f"ns=2;s=opcua/{name}") for name in READ_POINTS]
+    else:
+        nodes = [client.get_node(f"ns=2;s=opcua/{name}") for name in WRITE_POINTS]
+    step = 0
+    while time.monotonic() < end:
+        start = time.monotonic()
+        if service == "read":
+            await client.read_values(nodes)
+        else:
+            step += 1
+            value = ua.Variant(float(step % 100), ua.VariantType.Float)
+            await client.write_values(nodes, [value] * len(nodes))
+        latencies.append(time.monotonic() - start)
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+async def run_case(clients: List[Client], service: str, pids: List[int]) -> Dict[str, float]:
+    latencies: List[float] = []
+    cpu_start = cpu_seconds(pids)
+    start = time.monotonic()
+    await asyncio.gather(*(session_loop(client, service, start + SECONDS, latencies) for client in clients))
+    elapsed = time.monotonic() - start
+    cpu_end = cpu_seconds(pids)
+    latencies.sort()
+    per_call = len(READ_POINTS) if service == "read" else len(WRITE_POINTS)
+    return {
+        "calls_per_s": len(latencies) / elapsed,
+        "values_per_s": len(latencies) * per_call / elapsed,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "cpu": (cpu_end - cpu_start) / elapsed * 100 if cpu_start is not None and cpu_end is not None else None,
+    }
+
+
+async def main() -> None:
+    pids = find_pids(SERVER_PROCESS)
+    print(f"OPC UA Read/Write service benchmark ({OPCUA_ENDPOINT}, {SECONDS:.0f}s per case)")
+    print(
+        f"{'sessions':>8} {'service':<7} {'connect s':>9} {'calls/s':>8} {'values/s':>9} "
+        f"{'p50 ms':>7} {'p99 ms':>7} {'server%':>8}"
+    )
+    for count in SESSIONS:
+        clients = [Client(OPCUA_ENDPOINT, timeout=30) for _ in range(count)]
+        start = time.monotonic()
+        await asyncio.gather(*(client.connect() for client in clients))
+        connect_s = time.monotonic() - start
+        try:
+            for service in ("read", "write"):
+                r = await run_case(clients, service, pids)
+                cpu = f"{r['cpu']:>8.1f}" if r["cpu"] is not None else f"{'n/a':>8}"
+                print(
+                    f"{count:>8} {service:<7} {connect_s:>9.2f} {r['calls_per_s']:>8.0f} {r['values_per_s']:>9.0f} "
+                    f"{r['p50_ms']:>7.1f} {r['p99_ms']:>7.1f} {cpu}"
+                )
+        finally:
+            await asyncio.gather(*(client.disconnect() for client in clients), return_exceptions=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
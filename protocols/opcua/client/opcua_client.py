@@ -1,22 +1,140 @@
+import os
+import threading
 import time
-from opcua import Client
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from opcua import Client, ua
+
+from opcua_batch import LAB_TAGS, TagBatch
+
+OPCUA_ENDPOINT = os.environ.get("OPCUA_ENDPOINT", "opc.tcp://proto-server-opcua:4840/")
+# "demo" toggles DO_01/AO_01 and reads AI_01; "subscribe" monitors every bench point and
+# reports notification latency and throughput.
+OPCUA_CLIENT_MODE = os.environ.get("OPCUA_CLIENT_MODE", "demo")
+PUBLISH_INTERVAL_MS = float(os.environ.get("OPCUA_SUB_INTERVAL_MS", "100"))
+SECONDS = float(os.environ.get("OPCUA_SUB_SECONDS", "10"))
+# AO_04 writes/s while subscribed; the server mirrors each one to AI_04, which times
+# write -> notification. 0 only listens.
+WRITE_RATE = float(os.environ.get("OPCUA_SUB_WRITE_RATE", "10"))
+
+POINTS = list(LAB_TAGS)
+
+
+def demo(client: Client) -> None:
+    # Setpoints go out in one Write, typed per node (AO nodes are Float, not Double).
+    batch = TagBatch(client, LAB_TAGS)
+    for step in range(3):
+        batch.write({"DO_01": True, "AO_01": 75.0 + step})
+        time.sleep(1)
+        print("AI_01", batch.read(["AI_01"])["AI_01"])
+        batch.write({"DO_01": False})
+        time.sleep(1)
+
+
+class SubscriptionCache:
+    """Subscription handler: keeps the latest (value, source timestamp) per point and times
+    the notifications as they arrive."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.values: Dict[str, Tuple[object, datetime]] = {}
+        self.notifications = 0
+        self.ages: List[float] = []
+        self.pending: Dict[float, float] = {}
+        self.echoes: List[float] = []
+
+    def datachange_notification(self, node, val, data) -> None:
+        now = time.monotonic()
+        received = datetime.utcnow()
+        name = node.nodeid.Identifier.rsplit("/", 1)[-1]
+        dv = data.monitored_item.Value
+        stamp = dv.SourceTimestamp or dv.ServerTimestamp
+        with self.lock:
+            self.values[name] = (val, stamp)
+            self.notifications += 1
+            if stamp is not None:
+                # Server clock to client clock: both sides of the lab share the host's.
+                self.ages.append((received - stamp).total_seconds())
+            if name == "AI_04":
+                sent = self.pending.pop(val, None)
+                if sent is not None:
+                    self.echoes.append(now - sent)
+
+    def expect(self, value: float, sent: float) -> None:
+        with self.lock:
+            self.pending[value] = sent
+
+    def reset(self) -> None:
+        """Drop the counters (not the cached values), e.g. after the initial notifications."""
+        with self.lock:
+            self.notifications = 0
+            self.ages = []
+            self.pending.clear()
+            self.echoes = []
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def distribution(values: List[float]) -> str:
+    if not values:
+        return "-"
+    ordered = sorted(values)
+    dist = (percentile(ordered, 0.5), percentile(ordered, 0.9), percentile(ordered, 0.99), ordered[-1])
+    return "p50/p90/p99/max " + "/".join(f"{value * 1000:.1f}" for value in dist) + " ms"
+
+
+def subscribe(client: Client) -> None:
+    cache = SubscriptionCache()
+    subscription = client.create_subscription(PUBLISH_INTERVAL_MS, cache)
+    nodes = [client.get_node(LAB_TAGS[name]) for name in POINTS]
+    subscription.subscribe_data_change(nodes)
+    ao4 = client.get_node(LAB_TAGS["AO_04"])
+    # Every monitored item reports its current value first; only count what follows.
+    time.sleep(max(1.0, PUBLISH_INTERVAL_MS / 1000 * 2))
+    initial = len(cache.values)
+    cache.reset()
+
+    writes = 0
+    value = 0.0
+    start = time.monotonic()
+    end = start + SECONDS
+    if WRITE_RATE > 0:
+        deadline = start
+        while deadline < end:
+            value = value % 100 + 1
+            cache.expect(value, time.monotonic())
+            ao4.set_value(ua.DataValue(ua.Variant(value, ua.VariantType.Float)))
+            writes += 1
+            deadline += 1.0 / WRITE_RATE
+            time.sleep(max(deadline - time.monotonic(), 0))
+    time.sleep(max(end - time.monotonic(), 0) + PUBLISH_INTERVAL_MS / 1000 * 2)
+    elapsed = time.monotonic() - start
+    subscription.delete()
+
+    with cache.lock:
+        print(
+            f"OPC UA subscription probe ({OPCUA_ENDPOINT}, {len(POINTS)} points, publishing interval "
+            f"{PUBLISH_INTERVAL_MS:.0f} ms, {WRITE_RATE:.0f} AO_04 writes/s, {SECONDS:.0f}s)"
+        )
+        print(f"initial values: {initial}/{len(POINTS)} points")
+        print(f"notifications: {cache.notifications} ({cache.notifications / elapsed:.1f}/s)")
+        print(f"source timestamp -> notification: {distribution(cache.ages)}")
+        if writes:
+            print(f"AO_04 write -> AI_04 notification ({len(cache.echoes)}/{writes}): {distribution(cache.echoes)}")
+        print("cache:", ", ".join(f"{name}={cache.values[name][0]}" for name in POINTS if name in cache.values))
 
 
 def main() -> None:
-    client = Client("opc.tcp://proto-server-opcua:4840/")
+    client = Client(OPCUA_ENDPOINT)
     client.connect()
     try:
-        do1 = client.get_node("ns=2;s=opcua/DO_01")
-        ao1 = client.get_node("ns=2;s=opcua/AO_01")
-        ai1 = client.get_node("ns=2;s=opcua/AI_01")
-
-        for step in range(3):
-            do1.set_value(True)
-            ao1.set_value(75.0 + step)
-            time.sleep(1)
-            print("AI_01", ai1.get_value())
-            do1.set_value(False)
-            time.sleep(1)
+        if OPCUA_CLIENT_MODE == "subscribe":
+            subscribe(client)
+        else:
+            demo(client)
     finally:
         client.disconnect()
 
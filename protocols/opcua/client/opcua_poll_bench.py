@@ -0,0 +1,92 @@
+import os
+import time
+from typing import Callable, Dict
+
+from opcua import Client, ua
+
+from opcua_batch import LAB_TAGS, TagBatch
+
+OPCUA_ENDPOINT = os.environ.get("OPCUA_ENDPOINT", "opc.tcp://proto-server-opcua:4840/")
+CYCLES = int(os.environ.get("OPCUA_POLL_BENCH_CYCLES", "200"))
+# AO_02/AO_03 feed nothing and AO_04 only mirrors to AI_04, so writes leave the counters alone.
+SETPOINTS = ["AO_02", "AO_03", "AO_04"]
+
+
+class CountingSocket:
+    """Wraps the client's socket wrapper: every request is one write, so writes count round trips."""
+
+    def __init__(self, inner) -> None:
+        self.inner = inner
+        self.writes = 0
+        self.sent = 0
+        self.received = 0
+
+    def read(self, size: int) -> bytes:
+        data = self.inner.read(size)
+        self.received += len(data)
+        return data
+
+    def write(self, data: bytes) -> None:
+        self.writes += 1
+        self.sent += len(data)
+        self.inner.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+
+def run_case(counter: CountingSocket, cycle: Callable[[int], None]) -> Dict[str, float]:
+    cycle(0)  # warm-up, and lets the receive thread pick up the counting wrapper
+    writes, sent, received = counter.writes, counter.sent, counter.received
+    start = time.perf_counter()
+    for step in range(1, CYCLES + 1):
+        cycle(step)
+    elapsed = time.perf_counter() - start
+    return {
+        "ms": elapsed / CYCLES * 1000,
+        "requests": (counter.writes - writes) / CYCLES,
+        "sent": (counter.sent - sent) / CYCLES,
+        "received": (counter.received - received) / CYCLES,
+    }
+
+
+def main() -> None:
+    client = Client(OPCUA_ENDPOINT)
+    client.connect()
+    try:
+        uasocket = client.uaclient._uasocket
+        counter = uasocket._socket = CountingSocket(uasocket._socket)
+        nodes = {name: client.get_node(nodeid) for name, nodeid in LAB_TAGS.items()}
+        batch = TagBatch(client, LAB_TAGS)
+
+        def poll_per_node(step: int) -> None:
+            for node in nodes.values():
+                node.get_value()
+
+        def poll_batched(step: int) -> None:
+            batch.read()
+
+        def write_per_node(step: int) -> None:
+            for name in SETPOINTS:
+                nodes[name].set_value(ua.DataValue(ua.Variant(float(step % 100), ua.VariantType.Float)))
+
+        def write_batched(step: int) -> None:
+            batch.write({name: float(step % 100) for name in SETPOINTS})
+
+        print(f"OPC UA per-node vs batched service calls ({OPCUA_ENDPOINT}, {CYCLES} cycles)")
+        print(f"{'cycle':<24} {'ms/cycle':>8} {'requests':>8} {'bytes out':>9} {'bytes in':>9}")
+        cases = (
+            (f"poll {len(LAB_TAGS)} tags, per node", poll_per_node),
+            (f"poll {len(LAB_TAGS)} tags, one Read", poll_batched),
+            (f"write {len(SETPOINTS)} AOs, per node", write_per_node),
+            (f"write {len(SETPOINTS)} AOs, one Write", write_batched),
+        )
+        for label, cycle in cases:
+            r = run_case(counter, cycle)
+            print(f"{label:<24} {r['ms']:>8.2f} {r['requests']:>8.0f} {r['sent']:>9.0f} {r['received']:>9.0f}")
+    finally:
+        client.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from asyncua import Client
+
+from opcua_generated import Schema
+
+SCHEMAS = os.environ.get(
+    "OPCUA_GEN_BENCH_SCHEMAS", "Area:10/P:100,Area:10/Line:10/P:100,Area:10/Line:10/Cell:10/P:100"
+).split(",")
+# Skip the eager build above this many nodes.
+EAGER_MAX = int(os.environ.get("OPCUA_GEN_BENCH_EAGER_MAX", "200000"))
+SAMPLE = int(os.environ.get("OPCUA_GEN_BENCH_SAMPLE", "1000"))
+CACHE = os.environ.get("OPCUA_GEN_CACHE", "10000")
+BIND = os.environ.get("OPCUA_GEN_BENCH_BIND", "127.0.0.1:4850")
+SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opcua_server.py")
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as handle:
+        for line in handle:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def wait_ready(endpoint: str, deadline: float) -> None:
+    while True:
+        try:
+            client = Client(endpoint, timeout=5)
+            await client.connect()
+            await client.disconnect()
+            return
+        except (OSError, asyncio.TimeoutError):
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+def sample_ids(schema: Schema, count: int) -> List[str]:
+    """Random variable NodeIds, spread over the whole tree."""
+    rng = random.Random(1)
+    ids = []
+    for _ in range(count):
+        path = [rng.randrange(n) for _, n in schema.levels]
+        ids.append(f"ns=2;s={schema.identifier(path)}")
+    return ids
+
+
+async def measure(text: str, cache: str) -> Dict[str, float]:
+    env = dict(os.environ, OPCUA_SERVER_MODE="asyncio", OPCUA_BIND=BIND, OPCUA_GEN_SCHEMA=text, OPCUA_GEN_CACHE=cache)
+    endpoint = f"opc.tcp://{BIND}/"
+    start = time.monotonic()
+    proc = subprocess.Popen([sys.executable, SERVER], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        await wait_ready(endpoint, start + 600)
+        startup = time.monotonic() - start
+        rss_start = rss_mb(proc.pid)
+        async with Client(endpoint, timeout=60) as client:
+            nodes = [client.get_node(nodeid) for nodeid in sample_ids(Schema(text), SAMPLE)]
+            begin = time.monotonic()
+            for i in range(0, len(nodes), 500):
+                await client.read_values(nodes[i : i + 500])
+            read_s = time.monotonic() - begin
+        return {"startup_s": startup, "rss_mb": rss_start, "rss_read_mb": rss_mb(proc.pid), "read_ms": read_s * 1000}
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+async def main() -> None:
+    print(f"OPC UA generated address space: startup and RSS (cache {CACHE}, {SAMPLE} random reads)")
+    print(f"{'nodes':>8} {'mode':<6} {'startup s':>9} {'RSS MB':>7} {'after MB':>8} {'read ms':>8}")
+    for text in SCHEMAS:
+        nodes = Schema(text).node_count()
+        for mode, cache in (("lazy", CACHE), ("eager", "0")):
+            if mode == "eager" and nodes > EAGER_MAX:
+                continue
+            r = await measure(text, cache)
+            print(
+                f"{nodes:>8} {mode:<6} {r['startup_s']:>9.2f} {r['rss_mb']:>7.0f} "
+                f"{r['rss_read_mb']:>8.0f} {r['read_ms']:>8.0f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
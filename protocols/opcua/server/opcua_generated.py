@@ -0,0 +1,248 @@
+"""Schema-generated address space for scale tests (asyncio server mode only).
+
+A schema such as "Area:10/Line:10/Cell:10/P:100" describes nested folders (every level
+but the last) and the variables under each leaf folder (the last level): here 1,110
+folders and 100,000 variables under Objects/Generated. NodeIds are the browse path,
+e.g. ns=2;s=gen/Area3/Line7/Cell2/P42, so any node can be built from its id
+alone. Nodes are created on first Browse/Read/Write and dropped again once more than
+OPCUA_GEN_CACHE are held, unless they were written or are monitored.
+"""
+import collections.abc
+import os
+from collections import OrderedDict
+from typing import Iterator, List, Optional, Tuple
+
+from asyncua import Server, ua
+from asyncua.server.address_space import NodeData
+
+OPCUA_GEN_SCHEMA = os.environ.get("OPCUA_GEN_SCHEMA", "")
+# Generated nodes kept materialized at once; 0 builds the whole schema up front instead.
+OPCUA_GEN_CACHE = int(os.environ.get("OPCUA_GEN_CACHE", "10000"))
+ROOT = "gen"
+# Variables cycle through the bench's point types.
+VARIANT_TYPES = [ua.VariantType.Boolean, ua.VariantType.Float, ua.VariantType.Int32]
+DEFAULTS = {ua.VariantType.Boolean: False, ua.VariantType.Float: 0.0, ua.VariantType.Int32: 0}
+
+
+class Schema:
+    def __init__(self, text: str) -> None:
+        self.levels: List[Tuple[str, int]] = []
+        for part in text.split("/"):
+            prefix, count = part.split(":")
+            self.levels.append((prefix, int(count)))
+        if len(self.levels) < 2:
+            raise ValueError(f"schema needs at least one folder level and a variable level: {text!r}")
+        self.widths = [len(str(count - 1)) for _, count in self.levels]
+
+    def node_count(self) -> int:
+        total, width = 1, 1
+        for _, count in self.levels:
+            width *= count
+            total += width
+        return total
+
+    def name(self, depth: int, index: int) -> str:
+        return f"{self.levels[depth][0]}{index:0{self.widths[depth]}d}"
+
+    def parse(self, identifier: str) -> Optional[List[int]]:
+        """Path indices for a generated identifier ("gen" -> []), or None if not one of ours."""
+        parts = identifier.split("/")
+        if parts[0] != ROOT or len(parts) > len(self.levels) + 1:
+            return None
+        path = []
+        for depth, part in enumerate(parts[1:]):
+            prefix, count = self.levels[depth]
+            digits = part[len(prefix):]
+            if not part.startswith(prefix) or len(digits) != self.widths[depth] or not digits.isdigit():
+                return None
+            index = int(digits)
+            if index >= count:
+                return None
+            path.append(index)
+        return path
+
+    def identifier(self, path: List[int]) -> str:
+        return "/".join([ROOT, *(self.name(depth, index) for depth, index in enumerate(path))])
+
+    def walk(self, path: Optional[List[int]] = None) -> Iterator[List[int]]:
+        path = path or []
+        yield path
+        if len(path) < len(self.levels):
+            for index in range(self.levels[len(path)][1]):
+                yield from self.walk([*path, index])
+
+
+class NodeBuilder:
+    """Builds NodeData for schema paths with the server's own attribute handling."""
+
+    def __init__(self, server: Server, schema: Schema, ns: int) -> None:
+        self.node_mgt = server.iserver.node_mgt_service
+        self.schema = schema
+        self.ns = ns
+        self.folder_type = ua.NodeId(ua.ObjectIds.FolderType)
+        self.variable_type = ua.NodeId(ua.ObjectIds.BaseDataVariableType)
+
+    def nodeid(self, path: List[int]) -> ua.NodeId:
+        return ua.NodeId(self.schema.identifier(path), self.ns)
+
+    def is_variable(self, path: List[int]) -> bool:
+        return len(path) == len(self.schema.levels)
+
+    def browse_name(self, path: List[int]) -> str:
+        return self.schema.name(len(path) - 1, path[-1]) if path else "Generated"
+
+    def reference(self, path: List[int], forward: bool, reftype: int) -> ua.ReferenceDescription:
+        name = self.browse_name(path)
+        desc = ua.ReferenceDescription()
+        desc.ReferenceTypeId = ua.NodeId(reftype)
+        desc.IsForward = forward
+        desc.NodeId = self.nodeid(path)
+        desc.BrowseName = ua.QualifiedName(name, self.ns)
+        desc.DisplayName = ua.LocalizedText(name)
+        if self.is_variable(path):
+            desc.NodeClass = ua.NodeClass.Variable
+            desc.TypeDefinition = self.variable_type
+        else:
+            desc.NodeClass = ua.NodeClass.Object
+            desc.TypeDefinition = self.folder_type
+        return desc
+
+    def root_reference(self) -> ua.ReferenceDescription:
+        return self.reference([], True, ua.ObjectIds.Organizes)
+
+    def build(self, path: List[int]) -> NodeData:
+        name = self.browse_name(path)
+        item = ua.AddNodesItem()
+        item.BrowseName = ua.QualifiedName(name, self.ns)
+        if self.is_variable(path):
+            vtype = VARIANT_TYPES[path[-1] % len(VARIANT_TYPES)]
+            attrs = ua.VariableAttributes()
+            attrs.DataType = ua.NodeId(vtype.value)
+            attrs.Value = ua.Variant(DEFAULTS[vtype], vtype)
+            attrs.ValueRank = ua.ValueRank.Scalar
+            attrs.Historizing = False
+            attrs.AccessLevel = ua.AccessLevel.CurrentRead.mask | ua.AccessLevel.CurrentWrite.mask
+            attrs.UserAccessLevel = attrs.AccessLevel
+            item.NodeClass = ua.NodeClass.Variable
+            typedef = self.variable_type
+        else:
+            attrs = ua.ObjectAttributes()
+            attrs.EventNotifier = 0
+            item.NodeClass = ua.NodeClass.Object
+            typedef = self.folder_type
+        attrs.Description = ua.LocalizedText(name)
+        attrs.DisplayName = ua.LocalizedText(name)
+        attrs.WriteMask = 0
+        attrs.UserWriteMask = 0
+        item.NodeAttributes = attrs
+
+        node = NodeData(self.nodeid(path))
+        self.node_mgt._add_node_attributes(node, item, add_timestamps=False)
+        refs = node.references
+        typedef_ref = ua.ReferenceDescription()
+        typedef_ref.ReferenceTypeId = ua.NodeId(ua.ObjectIds.HasTypeDefinition)
+        typedef_ref.IsForward = True
+        typedef_ref.NodeId = typedef
+        typedef_ref.NodeClass = ua.NodeClass.ObjectType if typedef == self.folder_type else ua.NodeClass.VariableType
+        refs.append(typedef_ref)
+        if path:
+            reftype = ua.ObjectIds.HasComponent if self.is_variable(path) else ua.ObjectIds.Organizes
+            refs.append(self.reference(path[:-1], False, reftype))
+        else:
+            parent = ua.ReferenceDescription()
+            parent.ReferenceTypeId = ua.NodeId(ua.ObjectIds.Organizes)
+            parent.IsForward = False
+            parent.NodeId = ua.NodeId(ua.ObjectIds.ObjectsFolder)
+            parent.NodeClass = ua.NodeClass.Object
+            parent.BrowseName = ua.QualifiedName("Objects", 0)
+            parent.DisplayName = ua.LocalizedText("Objects")
+            refs.append(parent)
+        if not self.is_variable(path):
+            depth = len(path)
+            child_ref = ua.ObjectIds.HasComponent if depth + 1 == len(self.schema.levels) else ua.ObjectIds.Organizes
+            for index in range(self.schema.levels[depth][1]):
+                refs.append(self.reference([*path, index], True, child_ref))
+        return node
+
+
+class GeneratedNodes(collections.abc.MutableMapping):
+    """Stands in for the address space's node dict, like asyncua's own LazyLoadingDict for
+    shelf-backed spaces: regular nodes live in `nodes`, generated ones are built on a miss
+    and kept in a bounded LRU."""
+
+    def __init__(self, nodes: dict, builder: NodeBuilder, limit: int) -> None:
+        self.nodes = nodes
+        self.builder = builder
+        self.limit = limit
+        self.generated: "OrderedDict[ua.NodeId, NodeData]" = OrderedDict()
+        self.defaults = {}
+
+    def path(self, key: object) -> Optional[List[int]]:
+        if not isinstance(key, ua.NodeId) or key.NamespaceIndex != self.builder.ns or not isinstance(key.Identifier, str):
+            return None
+        return self.builder.schema.parse(key.Identifier)
+
+    def __getitem__(self, key: ua.NodeId) -> NodeData:
+        try:
+            return self.nodes[key]
+        except KeyError:
+            pass
+        node = self.generated.get(key)
+        if node is not None:
+            self.generated.move_to_end(key)
+            return node
+        path = self.path(key)
+        if path is None:
+            raise KeyError(key)
+        node = self.generated[key] = self.builder.build(path)
+        value = node.attributes.get(ua.AttributeIds.Value)
+        if value is not None:
+            self.defaults[key] = value.value
+        self.evict()
+        return node
+
+    def evict(self) -> None:
+        while len(self.generated) > self.limit:
+            key, node = self.generated.popitem(last=False)
+            default = self.defaults.pop(key, None)
+            value = node.attributes.get(ua.AttributeIds.Value)
+            # Written or monitored nodes are kept for good; the rest can be rebuilt.
+            if value is not None and (value.value is not default or value.datachange_callbacks):
+                self.nodes[key] = node
+
+    def __setitem__(self, key: ua.NodeId, value: NodeData) -> None:
+        self.generated.pop(key, None)
+        self.nodes[key] = value
+
+    def __delitem__(self, key: ua.NodeId) -> None:
+        if key in self.nodes:
+            del self.nodes[key]
+        else:
+            del self.generated[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.nodes or key in self.generated or self.path(key) is not None
+
+    def __iter__(self) -> Iterator[ua.NodeId]:
+        yield from self.nodes
+        yield from list(self.generated)
+
+    def __len__(self) -> int:
+        return len(self.nodes) + len(self.generated)
+
+
+def install(server: Server, ns: int) -> Optional[Schema]:
+    """Hang the OPCUA_GEN_SCHEMA tree under Objects; returns the schema, or None if unset."""
+    if not OPCUA_GEN_SCHEMA:
+        return None
+    schema = Schema(OPCUA_GEN_SCHEMA)
+    builder = NodeBuilder(server, schema, ns)
+    aspace = server.iserver.aspace
+    objects = aspace[ua.NodeId(ua.ObjectIds.ObjectsFolder)]
+    objects.references.append(builder.root_reference())
+    if OPCUA_GEN_CACHE > 0:
+        aspace._nodes = GeneratedNodes(aspace._nodes, builder, OPCUA_GEN_CACHE)
+    else:
+        for path in schema.walk():
+            aspace[builder.nodeid(path)] = builder.build(path)
+    return schema
@@ -1,7 +1,37 @@
+import asyncio
+import os
+import threading
 import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import asyncua
 from opcua import ua, Server
 
+import opcua_generated
+
 THRESHOLD = 70.0
+MAX_INT = 2**31 - 1
+OPCUA_BIND = os.environ.get("OPCUA_BIND", "0.0.0.0:4840")
+ENDPOINT = f"opc.tcp://{OPCUA_BIND}/"
+# "threaded" serves the lab with python-opcua (0.98); "asyncio" serves the same address
+# space with asyncua, on one event loop.
+OPCUA_SERVER_MODE = os.environ.get("OPCUA_SERVER_MODE", "threaded")
+
+# (name, initial value, variant type name, writable), in address-space order.
+POINTS = (
+    [(f"DO_0{i}", False, "Boolean", True) for i in range(1, 9)]
+    + [(f"DI_0{i}", False, "Boolean", False) for i in range(1, 9)]
+    + [(f"AO_0{i}", 0.0, "Float", True) for i in range(1, 5)]
+    + [(f"AI_0{i}", 0.0, "Float", False) for i in range(1, 5)]
+    + [("TMR_01", 0, "Int32", False), ("CNT_01", 0, "Int32", False)]
+)
+INPUTS = [f"DO_0{i}" for i in range(1, 9)] + [f"AO_0{i}" for i in range(1, 5)]
+# Derived points, in the order BenchLogic.step returns them.
+OUTPUTS = (
+    [f"DI_0{i}" for i in range(1, 9)] + [f"AI_0{i}" for i in range(1, 5)] + ["TMR_01", "CNT_01"]
+)
+VARIANT_TYPES = {name: vtype for name, _, vtype, _ in POINTS}
 
 
 def add_var(parent, name, value, vtype, writable=False):
@@ -11,84 +41,245 @@ def add_var(parent, name, value, vtype, writable=False):
     return node
 
 
-def main() -> None:
+class BenchLogic:
+    """The bench rules, independent of the OPC UA stack serving them."""
+
+    def __init__(self) -> None:
+        self.prev_ao1 = 0.0
+        self.prev_do = [False] * 8
+        self.timer = 0
+        self.switch_count = 0
+        self.thresh_count = 0
+        self.last_tick = time.monotonic()
+        self.written: Dict[str, object] = {}
+
+    def step(self, inputs: List[object]) -> List[Tuple[str, object]]:
+        """inputs: INPUTS values; returns (point, value) writes: reset DOs and changed derived values."""
+        current_do = [bool(v) for v in inputs[:8]]
+        ao_vals = [float(v) for v in inputs[8:]]
+        ao1 = ao_vals[0]
+        writes: List[Tuple[str, object]] = []
+
+        reset_requested = current_do[4] and not self.prev_do[4]
+        if reset_requested:
+            self.timer = 0
+            self.switch_count = 0
+            self.thresh_count = 0
+            self.prev_ao1 = ao1
+            self.last_tick = time.monotonic()
+            for idx in range(5):
+                current_do[idx] = False
+                writes.append((f"DO_0{idx + 1}", False))
+        else:
+            for idx in range(4):
+                if not self.prev_do[idx] and current_do[idx]:
+                    self.switch_count = min(self.switch_count + 1, MAX_INT)
+
+            crossed = self.prev_ao1 <= THRESHOLD < ao1
+            if crossed:
+                self.thresh_count = min(self.thresh_count + 1, MAX_INT)
+            self.prev_ao1 = ao1
+
+            now = time.monotonic()
+            if crossed or ao1 <= THRESHOLD:
+                # The logic may have been idle for a long time; only time above the threshold counts.
+                self.last_tick = now
+            elif now - self.last_tick >= 1.0:
+                ticks = int(now - self.last_tick)
+                self.last_tick += ticks
+                self.timer = min(self.timer + ticks, MAX_INT)
+
+        self.prev_do = list(current_do)
+        derived = [
+            *current_do,
+            ao1,
+            float(self.switch_count),
+            float(self.thresh_count),
+            ao_vals[3],
+            self.timer,
+            self.thresh_count,
+        ]
+        for name, value in zip(OUTPUTS, derived):
+            if self.written.get(name) != value:
+                writes.append((name, value))
+                self.written[name] = value
+        return writes
+
+    def next_timeout(self) -> Optional[float]:
+        """Only the timer needs time to pass; wake for its next whole second while AO_01 is high."""
+        if self.prev_ao1 <= THRESHOLD:
+            return None
+        return max(self.last_tick + 1.0 - time.monotonic(), 0.0)
+
+
+def read_params(stack, nodeids: List[object]):
+    """One Read request for the Value of every node; stack is opcua.ua or asyncua.ua."""
+    params = stack.ReadParameters()
+    for nodeid in nodeids:
+        rv = stack.ReadValueId()
+        rv.NodeId = nodeid
+        rv.AttributeId = stack.AttributeIds.Value
+        params.NodesToRead.append(rv)
+    return params
+
+
+def write_params(stack, values: List[Tuple[object, object]], timestamp: datetime):
+    """One Write request; values are (nodeid, ua.Variant) pairs."""
+    params = stack.WriteParameters()
+    for nodeid, variant in values:
+        dv = stack.DataValue(variant)
+        dv.SourceTimestamp = timestamp
+        wv = stack.WriteValue()
+        wv.NodeId = nodeid
+        wv.AttributeId = stack.AttributeIds.Value
+        wv.Value = dv
+        params.NodesToWrite.append(wv)
+    return params
+
+
+class ThreadedBench:
+    """python-opcua front end: datachange callbacks on the DO/AO nodes wake a logic thread,
+    which reads the inputs in one Read call and writes what changed in one Write call."""
+
+    def __init__(self, server: Server, nodes: Dict[str, object]) -> None:
+        self.server = server
+        self.session = server.iserver.isession
+        self.nodeids = {name: node.nodeid for name, node in nodes.items()}
+        self.logic = BenchLogic()
+        self.wake = threading.Event()
+
+    def watch(self) -> None:
+        """Register with the address space itself (what subscriptions build on): the callback
+        fires in the writing session's thread, with no publishing interval to wait for."""
+        for name in INPUTS:
+            self.server.iserver.aspace.add_datachange_callback(
+                self.nodeids[name], ua.AttributeIds.Value, self.on_datachange
+            )
+
+    def on_datachange(self, handle, value) -> None:
+        self.wake.set()
+
+    def write_values(self, writes: List[Tuple[str, object]]) -> None:
+        if not writes:
+            return
+        values = [
+            (self.nodeids[name], ua.Variant(value, getattr(ua.VariantType, VARIANT_TYPES[name])))
+            for name, value in writes
+        ]
+        for status in self.session.write(write_params(ua, values, datetime.utcnow())):
+            status.check()
+
+    def run(self) -> None:
+        inputs = read_params(ua, [self.nodeids[name] for name in INPUTS])
+        while True:
+            self.wake.wait(self.logic.next_timeout())
+            self.wake.clear()
+            values = [dv.Value.Value for dv in self.session.read(inputs)]
+            self.write_values(self.logic.step(values))
+
+
+class AsyncBench:
+    """asyncua front end: same flow on the server's event loop; the derived values go out
+    as one batched Write through the attribute service."""
+
+    def __init__(self, server: asyncua.Server, nodes: Dict[str, object]) -> None:
+        self.server = server
+        self.nodeids = {name: node.nodeid for name, node in nodes.items()}
+        self.logic = BenchLogic()
+        self.wake = asyncio.Event()
+
+    def watch(self) -> None:
+        for name in INPUTS:
+            self.server.iserver.aspace.add_datachange_callback(
+                self.nodeids[name], asyncua.ua.AttributeIds.Value, self.on_datachange
+            )
+
+    async def on_datachange(self, handle, value) -> None:
+        self.wake.set()
+
+    async def write_values(self, writes: List[Tuple[str, object]]) -> None:
+        if not writes:
+            return
+        aua = asyncua.ua
+        values = [
+            (self.nodeids[name], aua.Variant(value, getattr(aua.VariantType, VARIANT_TYPES[name])))
+            for name, value in writes
+        ]
+        params = write_params(aua, values, datetime.now(timezone.utc))
+        for status in await self.server.iserver.attribute_service.write(params):
+            status.check()
+
+    async def run(self) -> None:
+        attributes = self.server.iserver.attribute_service
+        inputs = read_params(asyncua.ua, [self.nodeids[name] for name in INPUTS])
+        while True:
+            try:
+                await asyncio.wait_for(self.wake.wait(), self.logic.next_timeout())
+            except asyncio.TimeoutError:
+                pass
+            self.wake.clear()
+            values = [dv.Value.Value for dv in attributes.read(inputs)]
+            await self.write_values(self.logic.step(values))
+
+
+def run_threaded() -> None:
     server = Server()
-    server.set_endpoint("opc.tcp://0.0.0.0:4840/")
+    server.set_endpoint(ENDPOINT)
     server.set_server_name("Unified OPC UA Lab")
 
     ns = server.register_namespace("opcua-lab")
     objects = server.get_objects_node()
     lab = objects.add_object(ns, "Lab")
-
-    do_vars = [add_var(lab, f"DO_0{i}", False, ua.VariantType.Boolean, True) for i in range(1, 9)]
-    di_vars = [add_var(lab, f"DI_0{i}", False, ua.VariantType.Boolean, False) for i in range(1, 9)]
-
-    ao_vars = [add_var(lab, f"AO_0{i}", 0.0, ua.VariantType.Float, True) for i in range(1, 5)]
-    ai_vars = [add_var(lab, f"AI_0{i}", 0.0, ua.VariantType.Float, False) for i in range(1, 5)]
-
-    tmr_01 = add_var(lab, "TMR_01", 0, ua.VariantType.Int32, False)
-    cnt_01 = add_var(lab, "CNT_01", 0, ua.VariantType.Int32, False)
-
-    prev_ao1 = 0.0
-    prev_do = [False] * 8
-    timer = 0
-    switch_count = 0
-    thresh_count = 0
-    last_tick = time.monotonic()
+    nodes = {
+        name: add_var(lab, name, value, getattr(ua.VariantType, vtype), writable)
+        for name, value, vtype, writable in POINTS
+    }
+    bench = ThreadedBench(server, nodes)
 
     server.start()
-    print("OPC UA server listening on opc.tcp://0.0.0.0:4840/")
+    print(f"OPC UA server listening on {ENDPOINT}")
 
     try:
-        while True:
-            current_do = [bool(v.get_value()) for v in do_vars]
-            reset_requested = current_do[4] and not prev_do[4]
-            if reset_requested:
-                timer = 0
-                switch_count = 0
-                thresh_count = 0
-                prev_ao1 = float(ao_vars[0].get_value())
-                last_tick = time.monotonic()
-                for idx in range(5):
-                    do_vars[idx].set_value(False)
-                current_do = [bool(v.get_value()) for v in do_vars]
-
-            for idx, val in enumerate(current_do):
-                di_vars[idx].set_value(val)
-
-            ao_vals = [float(v.get_value()) for v in ao_vars]
-            ao1 = ao_vals[0]
-
-            if not reset_requested:
-                for idx in range(4):
-                    if not prev_do[idx] and current_do[idx]:
-                        switch_count = min(switch_count + 1, 2**31 - 1)
-
-                if prev_ao1 <= THRESHOLD < ao1:
-                    thresh_count = min(thresh_count + 1, 2**31 - 1)
-                prev_ao1 = ao1
-
-                now = time.monotonic()
-                if now - last_tick >= 1.0:
-                    ticks = int(now - last_tick)
-                    last_tick += ticks
-                    if ao1 > THRESHOLD:
-                        timer = min(timer + ticks, 2**31 - 1)
-
-            ai_vars[0].set_value(ao1)
-            ai_vars[1].set_value(switch_count)
-            ai_vars[2].set_value(thresh_count)
-            ai_vars[3].set_value(ao_vals[3])
-
-            tmr_01.set_value(timer)
-            cnt_01.set_value(thresh_count)
-
-            prev_do = list(current_do)
-
-            time.sleep(1)
+        bench.watch()
+        bench.run()
     finally:
         server.stop()
 
 
+async def run_asyncio() -> None:
+    aua = asyncua.ua
+    server = asyncua.Server()
+    await server.init()
+    server.set_endpoint(ENDPOINT)
+    server.set_server_name("Unified OPC UA Lab")
+
+    ns = await server.register_namespace("opcua-lab")
+    lab = await server.nodes.objects.add_object(ns, "Lab")
+    nodes = {}
+    for name, value, vtype, writable in POINTS:
+        node = await lab.add_variable(f"ns=2;s=opcua/{name}", name, value, getattr(aua.VariantType, vtype))
+        if writable:
+            await node.set_writable()
+        nodes[name] = node
+    bench = AsyncBench(server, nodes)
+    schema = opcua_generated.install(server, ns)
+    if schema is not None:
+        print(f"generated address space {opcua_generated.OPCUA_GEN_SCHEMA}: {schema.node_count()} nodes")
+
+    async with server:
+        print(f"OPC UA server (asyncio) listening on {ENDPOINT}")
+        bench.watch()
+        await bench.run()
+
+
+def main() -> None:
+    if OPCUA_SERVER_MODE == "asyncio":
+        asyncio.run(run_asyncio())
+    elif opcua_generated.OPCUA_GEN_SCHEMA:
+        raise SystemExit("OPCUA_GEN_SCHEMA needs OPCUA_SERVER_MODE=asyncio")
+    else:
+        run_threaded()
+
+
 if __name__ == "__main__":
     main()
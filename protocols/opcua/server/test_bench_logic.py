@@ -0,0 +1,56 @@
+import types
+
+import opcua_server
+from opcua_server import INPUTS, BenchLogic
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+def inputs(ao1: float) -> list:
+    values = dict.fromkeys(INPUTS, False)
+    values.update({name: 0.0 for name in INPUTS if name.startswith("AO_")}, AO_01=ao1)
+    return [values[name] for name in INPUTS]
+
+
+def timer(writes) -> int:
+    return dict(writes).get("TMR_01")
+
+
+def test_idle_time_below_threshold_is_not_counted(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(opcua_server, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    logic = BenchLogic()
+    logic.step(inputs(0.0))
+    assert logic.next_timeout() is None
+
+    # Idle for 10 s (nothing wakes the logic), then a write takes AO_01 over the threshold.
+    clock.now += 10.0
+    logic.step(inputs(80.0))
+    clock.now += 0.2
+    logic.step(inputs(80.0))
+    assert logic.timer <= 1
+
+    clock.now += 1.0
+    assert timer(logic.step(inputs(80.0))) == 1
+    clock.now += logic.next_timeout()
+    assert timer(logic.step(inputs(80.0))) == 2
+
+
+def test_timer_stops_below_threshold(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(opcua_server, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    logic = BenchLogic()
+    logic.step(inputs(80.0))
+    clock.now += 3.0
+    logic.step(inputs(80.0))
+    assert logic.timer == 3
+    logic.step(inputs(10.0))
+    clock.now += 30.0
+    logic.step(inputs(80.0))
+    assert logic.timer == 3
@@ -87,7 +87,7 @@ def main() -> None:
             "postTags": os.environ.get("CIP_POST", DEFAULT_ADDR),
         },
         "type": "WebAPI",
-        "polling": 3000,
+        "polling": 200,
         "tags": cip_tags,
     }
 
@@ -87,7 +87,7 @@ def main() -> None:
             "postTags": os.environ.get("IEC104_POST", DEFAULT_ADDR),
         },
         "type": "WebAPI",
-        "polling": 1000,
+        "polling": 200,
         "tags": iec104_tags,
     }
 
@@ -24,6 +24,27 @@ def make_tag(tag_id, name, tag_type, address, description):
     }
 
 
+def check_tags(endpoint, tags):
+    """Read every tag address from the server in one Read call; exit on any NodeId it rejects."""
+    from opcua import Client, ua  # only needed with OPCUA_SEED_CHECK=1
+
+    client = Client(endpoint)
+    client.connect()
+    try:
+        nodeids = [ua.NodeId.from_string(tag["address"]) for tag in tags.values()]
+        results = client.uaclient.get_attributes(nodeids, ua.AttributeIds.Value)
+    finally:
+        client.disconnect()
+    bad = [
+        f"{tag['address']} ({dv.StatusCode.name})"
+        for tag, dv in zip(tags.values(), results)
+        if not dv.StatusCode.is_good()
+    ]
+    if bad:
+        raise SystemExit("OPC UA server rejected: " + ", ".join(bad))
+    print(f"Checked {len(nodeids)} OPC UA tags against {endpoint} in one Read.")
+
+
 def main() -> None:
     db_path = os.environ.get("FUXA_DB", DEFAULT_DB)
     if not os.path.exists(db_path):
@@ -78,12 +99,16 @@ def main() -> None:
     add_tag("u_tmr_01", "TMR_01", "Float", "ns=2;s=opcua/TMR_01", "Timer above 70%")
     add_tag("u_cnt_01", "CNT_01", "Float", "ns=2;s=opcua/CNT_01", "Crossings above 70%")
 
+    endpoint = os.environ.get("OPCUA_ENDPOINT", DEFAULT_ENDPOINT)
+    if os.environ.get("OPCUA_SEED_CHECK") == "1":
+        check_tags(endpoint, opcua_tags)
+
     opcua_device = {
         "id": opcua_id,
         "name": "opcua",
         "enabled": True,
         "property": {
-            "address": os.environ.get("OPCUA_ENDPOINT", DEFAULT_ENDPOINT),
+            "address": endpoint,
         },
         "type": "OPCUA",
         "polling": 200,